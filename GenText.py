@@ -39,13 +39,29 @@
 # g.addAlso(text):
 # g.endAlso():
 #
+# g.startInherited(classname):
+# g.endInherited():
+#      surround the methods a class inherits from classname
+#
+# g.methodTable(classname, methods):
+#      table of methods, as (method, summary), each linking to its own page
+#
+# part = g.fork()
+# g.join(part):
+#      render part of a page apart, perhaps in another process, and append
+#      it.  Only for generators whose parallel attribute is True, those
+#      whose output is the concatenation of their events
+#
 
 from functools import partial
 import re
 import os
+import copy
 from datetime import date
+from cStringIO import StringIO
 import sys
 import parse
+from layout import Layout
 
 
 
@@ -76,6 +92,110 @@ def changecaps(s):
         return
 
 
+class lazy_re(object):
+    # a regular expression compiled on first use, as a class attribute it
+    # is compiled once and shared by every instance
+    def __init__(self, pattern, flags=0):
+        self.pattern = pattern
+        self.flags = flags
+        self.regex = None
+
+    def __get__(self, obj, cls):
+        if self.regex is None:
+            self.regex = re.compile(self.pattern, self.flags)
+        return self.regex
+
+
+def listfiles(filepath, walk=os.walk):
+    # return the root names of all .m and .mlx files below filepath, walk
+    # lists the folders as os.walk does
+    names = []
+    for root, dirs, files in walk(filepath):
+        for file in files:
+            if os.path.splitext(file)[1] not in ('.m', '.mlx'):
+                # skip non matlab files
+                continue
+            names.append(os.path.splitext(file)[0])
+    return names
+
+
+# output folders known to exist
+folders = set()
+
+# the linkcheck.Manifest of the pages written by the run, if the links are
+# to be checked
+manifest = None
+
+# the outputs.Outputs of the output folder being built, if the files
+# written are to be listed
+outputs = None
+
+# set of .m file names below each filepath, shared by all the generators
+# of a run rather than walking the tree for every page
+filesets = {}
+
+def fileset(filepath):
+    try:
+        return filesets[filepath]
+    except KeyError:
+        filesets[filepath] = frozenset(listfiles(filepath))
+        return filesets[filepath]
+
+
+# the inline rules of each backend compiled into one pass, key is the class
+inline_passes = {}
+
+def inline_pass(cls):
+    # (regex, rules): regex matches any of the rules, the one matched is
+    # group Rn, rules[n] is (its own regex, replacement).  regex is None if
+    # there are no rules
+    try:
+        return inline_passes[cls]
+    except KeyError:
+        pass
+    rules = []
+    for klass in cls.__mro__:
+        rules.extend(klass.__dict__.get('site_inline', ()))
+    rules.extend(cls.inline)
+    regex = None
+    if rules:
+        alternatives = []
+        for (i, (pattern, replace)) in enumerate(rules):
+            pattern = parse.re_group.sub(lambda m, i=i: '(?P%sR%d_%s' % (m.group(1), i, m.group(2)), pattern)
+            alternatives.append('(?P<R%d>%s)' % (i, pattern))
+        regex = re.compile('|'.join(alternatives))
+    inline_passes[cls] = (regex, [(re.compile(pattern), replace) for (pattern, replace) in rules])
+    return inline_passes[cls]
+
+
+class Memo(object):
+    # bounded memo of computed results.  When it is full the least recently
+    # used half is dropped, so that a hit stays a dict lookup
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self.entries = {}
+        self.tick = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.tick += 1
+        entry[1] = self.tick
+        return entry[0]
+
+    def put(self, key, value):
+        if len(self.entries) >= self.maxsize:
+            entries = sorted(self.entries.iteritems(), key=lambda e: e[1][1])
+            self.entries = dict(entries[len(entries) // 2:])
+        self.tick += 1
+        self.entries[key] = [value, self.tick]
+
+
 def split_first_word(s):
     k = s.find(' ')
     if k < 0:
@@ -91,80 +211,231 @@ def split_first_word(s):
 # =============================================================================
 
 class GenHelp(object):
-    def __init__(self, filepath=None):
+    # regular expressions, compiled on first use
+    re_word = lazy_re(r'''(?<![\\{A-Za-z])[a-zA-Z][a-zA-Z0-9_']*\b''')
+    re_signature = lazy_re(r"""
+        \s*   # initial blank space
+        (   # LHS
+            (
+                (?P<lhs1>[a-zA-Z][a-zA-Z0-9]*)      # single output var
+                |
+                (
+                    \[                              # list of output vars
+                        (?P<lhs2>
+                            ([a-zA-Z][a-zA-Z0-9]*)
+                            (
+                                \s*,\s*
+                                ([a-zA-Z][a-zA-Z0-9]*)
+                            )*
+                        )
+                    \]
+                )
+            )
+            \s*=\s*
+        )?
+        \s* # RHS
+        (
+            (
+                (?P<subject>[a-zA-Z][a-zA-Z0-9]*\.)?    # leading object and dot
+                (?P<method>[a-zA-Z][a-zA-Z0-9\._]*)     # method or function name
+                    \(                                  # parameter list
+                        (
+                            (?P<rhs>                      # argument list
+                                    ([a-zA-Z'][a-zA-Z0-9']*)      # first var
+                                    (                             # remainder of var list
+                                        (\s*,\s*)
+                                        ([a-zA-Z'][a-zA-Z0-9']*)
+                                    )*
+                            )
+                            |(\.\.\.)                      # ellipsis
+                            |(\s*\[[^]]+\])
+                        )?    # can be empty parenthesis
+                    \)
+            )
+            |(?P<rhs1>[A-Za-z][A-Za-z0-9]*)\.(?P<rhs2>[A-Za-z][A-Za-z0-9]*)   # A.B
+            |(?P<rhs3>[A-Za-z][A-Za-z0-9]*)\s*[.]?[+*/|^-]\s*(?P<rhs4>[A-Za-z][A-Za-z0-9]*)   # A*B
+        )
+        """, re.X)
+
+    re_filename = lazy_re(r'([a-zA-Z][a-zA-Z0-9_/]+\.(mlx|m))')
+
+    # transformed text, shared by all the generators of a run
+    memo = Memo()
+
+    # the inline substitutions of the backend, (pattern, replacement) tried
+    # in order at each place in the text by substitutions().  replacement is
+    # a template as for re.sub or a function of the match
+    inline = []
+    # and those a site added with add_inline()
+    site_inline = []
+
+    # how the line types a site added with add_line() are rendered, key is
+    # the type
+    line_renderers = {}
+
+    # methods may be rendered apart and joined, see fork()
+    parallel = True
+
+    # suffix of the page of a module
+    suffix = ''
+
+    def __init__(self, filepath=None, writer=None, outdir=None, symbols=None, layout=None, page=None):
         if filepath:
             self.filepath = filepath
         else:
             self.filepath = '.'
+        # pipeline.Writer to write the output files, or None to write them
+        # directly
+        self.writer = writer
         self.filelist = []
 
+        # folder the output files are written to, if not the current one
+        self.outdir = outdir
+
+        # where the pages go below outdir, and the folder of the page being
+        # rendered, which links are relative to
+        self.layout = layout or Layout()
+        self.page = page
+        self.here = self.layout.folder(page) if page else ''
+
+        # functions of the other toolboxes of a build, key is the lower case
+        # name, value is (name, link to its page from this toolbox, with the
+        # suffix of that toolbox's backend)
+        self.symbols = symbols
+
+        # names looked up by findfile() while rendering, the page depends
+        # on whether files of these names exist
+        self.depends = set()
+
+        # the links the page makes and the anchors it defines, noted in the
+        # manifest when it is written
+        self.links = []
+        self.anchors = []
+
         # empty the buffer
         self.out = ''
+        self.outstream = None
 
         # set of extracted variables is empty
         self.vars = set()
         self.funcname = None
 
-        # create compiled re's for later
-        self.re_word = re.compile(r'''(?<![\\{A-Za-z])[a-zA-Z][a-zA-Z0-9_']*\b''')
-        self.re_signature = re.compile(r"""
-            \s*   # initial blank space
-            (   # LHS
-                (
-                    (?P<lhs1>[a-zA-Z][a-zA-Z0-9]*)      # single output var
-                    |
-                    (
-                        \[                              # list of output vars
-                            (?P<lhs2>
-                                ([a-zA-Z][a-zA-Z0-9]*)
-                                (
-                                    \s*,\s*
-                                    ([a-zA-Z][a-zA-Z0-9]*)
-                                )*
-                            )
-                        \]
-                    )
-                )
-                \s*=\s*
-            )?
-            \s* # RHS
-            (
-                (
-                    (?P<subject>[a-zA-Z][a-zA-Z0-9]*\.)?    # leading object and dot
-                    (?P<method>[a-zA-Z][a-zA-Z0-9\._]*)     # method or function name
-                        \(                                  # parameter list
-                            (
-                                (?P<rhs>                      # argument list
-                                        ([a-zA-Z'][a-zA-Z0-9']*)      # first var
-                                        (                             # remainder of var list
-                                            (\s*,\s*)
-                                            ([a-zA-Z'][a-zA-Z0-9']*)
-                                        )*
-                                )
-                                |(\.\.\.)                      # ellipsis
-                                |(\s*\[[^]]+\])
-                            )?    # can be empty parenthesis
-                        \)
-                )
-                |(?P<rhs1>[A-Za-z][A-Za-z0-9]*)\.(?P<rhs2>[A-Za-z][A-Za-z0-9]*)   # A.B
-                |(?P<rhs3>[A-Za-z][A-Za-z0-9]*)\s*[.]?[+*/|^-]\s*(?P<rhs4>[A-Za-z][A-Za-z0-9]*)   # A*B
-            )
-            """, re.X)
+        # options(), fixed once the backend's constructor has run, kept for
+        # the transform memo key
+        self.options_key = None
 
-        self.re_filename = re.compile(r'([a-zA-Z][a-zA-Z0-9_/]+\.(mlx|m))')
+    def stream(self, outfile):
+        # write the output to outfile as it is flushed, rather than holding
+        # the whole document in memory until write()
+        self.outstream = open(self.outpath(outfile), 'w')
 
+    def flush(self):
+        # write out the buffer, if streaming
+        if self.outstream:
+            self.outstream.write(self.out)
+            self.out = ''
 
     def write(self, outfile, display=False):
         self.done()
-        # dump it to a file
-        out = open(outfile, 'w')
-        out.write(self.out)
-        out.close()
+        if self.outstream:
+            # the rest of the streamed document
+            self.flush()
+            self.outstream.close()
+            self.outstream = None
+            if outputs is not None:
+                outputs.add_file(self.outpath(outfile), self.page)
+        else:
+            # dump it to a file
+            self.writefile(outfile, self.out)
+        self.record(outfile)
 
         # optionally open it for perusal
         if display:
             os.system('open %s' % outfile)
 
+    def fork(self):
+        # a generator in the same state with an empty buffer, that can be
+        # pickled
+        part = copy.copy(self)
+        part.out = ''
+        part.vars = set(self.vars)
+        part.depends = set()
+        part.links = []
+        part.anchors = []
+        part.writer = None
+        part.outstream = None
+        return part
+
+    def join(self, part):
+        # append what part rendered, and continue from its state
+        self.out += part.out
+        self.depends |= part.depends
+        self.links.extend(part.links)
+        self.anchors.extend(part.anchors)
+        self.vars = part.vars
+
+    def href(self, target):
+        # a link to target, relative to the page, for the link check
+        self.links.append(target)
+        return target
+
+    def record(self, outfile):
+        # note a page written, its links and anchors, in the manifest
+        if manifest is not None:
+            manifest.add(self.outpath(outfile), self.links, self.anchors)
+        self.links = []
+        self.anchors = []
+
+    @classmethod
+    def add_inline(cls, pattern, replace):
+        # an inline substitution of a site's own, for this backend and those
+        # derived from it, tried before the backend's own.  It is part of
+        # the one pass of substitutions(), its replacement is not escaped
+        cls.site_inline = cls.__dict__.get('site_inline', []) + [(pattern, replace)]
+        inline_passes.clear()
+
+    @staticmethod
+    def add_line(name, pattern, render, before=parse.TEXT):
+        # a line type of a site's own, classified by pattern as described
+        # for parse.add_line(), render(gen, line) renders a line of it, a
+        # parse.MATLABLine, with the methods of gen.  Returns the type
+        typ = parse.add_line(name, pattern, before)
+        GenHelp.line_renderers[typ] = render
+        return typ
+
+    def options(self):
+        # identifies the backend and any options that change its output,
+        # part of the cache key of a rendered page
+        return self.__class__.__name__
+
+    def outpath(self, outfile):
+        # where an output file is written
+        if self.outdir:
+            return os.path.join(self.outdir, outfile)
+        else:
+            return outfile
+
+    def codefile(self, filename):
+        # name of the code page for an m-file
+        return self.layout.path(os.path.splitext(filename.lstrip('@'))[0]) + self.code_suffix
+
+    def writefile(self, outfile, data):
+        outfile = self.outpath(outfile)
+        folder = os.path.dirname(outfile)
+        if folder and folder not in folders:
+            # made here, before the write is queued to an I/O thread
+            if not os.path.isdir(folder):
+                os.makedirs(folder)
+            folders.add(folder)
+        if self.writer:
+            self.writer.write(outfile, data)
+        else:
+            out = open(outfile, 'w')
+            out.write(data)
+            out.close()
+        if outputs is not None:
+            outputs.add(outfile, data, self.page)
+
     def done(self):
         pass
 
@@ -244,12 +515,16 @@ class GenHelp(object):
         if not doc:
             return
 
+        # doc can be a string or a parse.TokenBlock
         parser = parse.Parser(doc)
 
         curLine = parser.nextLine()
 
         liststack = []
 
+        # check.check_block walks the LIST and TABLE states the same way to
+        # lint them, a change to the nesting or table rules here goes there
+        # too
         while True:
             # ============================== LINE
             if curLine.type == parse.TEXT:
@@ -408,22 +683,48 @@ class GenHelp(object):
             elif curLine.type == parse.BLANKLINE:
                 pass
 
+            # ============================== a site's own
+            elif curLine.type in self.line_renderers:
+                self.line_renderers[curLine.type](self, curLine)
+
             # ============================== END
             elif curLine.type == parse.END:
                 break
 
             curLine = parser.nextLine()
 
+    def startInherited(self, classname):
+        # the methods inherited from classname follow
+        self.heading('Methods inherited from %s' % classname)
+
+    def endInherited(self):
+        pass
+
+    def methodTable(self, classname, methods):
+        # the method table of a class split into a page per method
+        self.startTable()
+        for (method, summary) in methods:
+            self.addTable(self.methodLink(classname, method), summary)
+        self.endTable()
+
+    def methodLink(self, classname, method):
+        return method
+
+    def referencedBy(self, names):
+        # list the functions whose See also lines name this one
+        self.heading('Referenced by')
+        self.startAlso()
+        for name in names:
+            self.addAlso(name)
+        self.endAlso()
+
     def findfile(self, filename):
         # lazy initialization of all .m file names
         if not self.filelist:
-            for root, dirs, files in os.walk(self.filepath):
-                for file in files:
-                    #print filename, file
-                    if os.path.splitext(file)[1] != '.m':
-                        # skip non matlab files
-                        continue
-                    self.filelist.append(os.path.splitext(file)[0])
+            self.filelist = fileset(self.filepath)
+
+        # the rendered page now depends on this name resolving, or not
+        self.depends.add(filename.lower())
 
         # check if the named file exists, in either given case or
         # lower case.  Return the version that matches.
@@ -432,10 +733,73 @@ class GenHelp(object):
         filename = filename.lower()
         if filename in self.filelist:
             return filename
+        if self.symbols and filename in self.symbols:
+            # a function in another toolbox of the build
+            return self.symbols[filename][0]
         return None
 
+    def code_links(self, filename, text):
+        # the names the code page of filename links, and where to
+        return []
+
+    def code_link(self, name):
+        # the page of a function of the run called as name in code, or None.
+        # Names are matched as MATLAB does, case sensitively
+        if not self.filelist:
+            self.filelist = fileset(self.filepath)
+        if name in self.filelist:
+            return self.link(name)
+        if self.symbols and name.lower() in self.symbols and self.symbols[name.lower()][0] == name:
+            return self.link(name)
+        return None
+
+    def link(self, name):
+        # the page for name relative to the page being rendered.  The page
+        # of a function of another toolbox has the suffix of its backend
+        if self.symbols and name.lower() in self.symbols:
+            return os.path.join(self.layout.root(self.here), self.symbols[name.lower()][1])
+        else:
+            return self.layout.link(name, self.here) + self.suffix
+
 
     def transform(self, s, **args):
+        # the same text recurs in many methods of a class, eg. shared option
+        # tables.  The result depends on the backend, and the variables and
+        # names in scope
+        if self.options_key is None:
+            self.options_key = self.options()
+        key = (self.options_key, s, frozenset(self.vars), self.funcname, args.get('classname'))
+        result = self.memo.get(key)
+        if result is None:
+            result = self.transform_text(s, **args)
+            self.memo.put(key, result)
+        return result
+
+    def substitutions(self, s):
+        # the backend's inline rules, in one pass over the text.  The text
+        # between matches is passed through plain()
+        (regex, rules) = inline_pass(self.__class__)
+        if regex is None:
+            return self.plain(s)
+        out = []
+        pos = 0
+        for m in regex.finditer(s):
+            if m.start() > pos:
+                out.append(self.plain(s[pos:m.start()]))
+            # the rule again, on its own, for its groups
+            (rule, replace) = rules[int(m.lastgroup[1:])]
+            m = rule.match(s, m.start())
+            out.append(replace(m) if callable(replace) else m.expand(replace))
+            pos = m.end()
+        if pos < len(s):
+            out.append(self.plain(s[pos:]))
+        return ''.join(out)
+
+    def plain(self, s):
+        # text no inline rule matched
+        return s
+
+    def transform_text(self, s, **args):
 
         s = self.substitutions(s)
         # substitute variables names
@@ -1,4 +1,29 @@
 from GenText import * # file parser and text rendering
+import gzip
+import chrome
+
+def gzip_compress(data):
+    # no name or timestamp in the header, so the same page always
+    # compresses to the same bytes
+    buf = StringIO()
+    f = gzip.GzipFile(filename='', mode='wb', compresslevel=9, fileobj=buf, mtime=0)
+    f.write(data)
+    f.close()
+    return buf.getvalue()
+
+def code_escape(s):
+    # code as HTML, the spaces of code are kept
+    if '&' in s:
+        s = s.replace('&', '&amp;')
+    if '<' in s:
+        s = s.replace('<', '&lt;')
+    if '>' in s:
+        s = s.replace('>', '&gt;')
+    return s.replace(' ', '&nbsp;')
+
+def brotli_compress(data):
+    import brotli
+    return brotli.compress(data)
 
 # =============================================================================
 # GenHTML subclass
@@ -6,9 +31,22 @@ from GenText import * # file parser and text rendering
 
 class GenHTML(GenHelp):
 
-    def __init__(self, matlab=False, toolbox=None, **kwargs):
+    suffix = '.html'
+
+    def __init__(self, matlab=False, toolbox=None, minify=False, brotli=False, templates=None, **kwargs):
         super(GenHTML, self).__init__(**kwargs)
         self.matlab = matlab
+        self.minify = minify
+        # page header, title bar and footer, from the folder templates
+        self.chrome = chrome.load(templates)
+
+        # compressed siblings written with each file, for the web server to
+        # send as they are
+        self.compressors = []
+        if minify:
+            self.compressors.append(('.gz', gzip_compress))
+        if brotli:
+            self.compressors.append(('.br', brotli_compress))
 
         if toolbox == 'rtb':
             self.toolboxname = "Robotics Toolbox for MATLAB"
@@ -17,20 +55,84 @@ class GenHTML(GenHelp):
             self.toolboxname = "Machine Vision Toolbox for MATLAB"
             self.toolboxurl = "http://www.petercorke.com/vision"
 
-    def done(self):
-        pass
+    code_suffix = '_code.html'
+
+    # HTML specific fixups
+    inline = [
+        ('<', '&lt;'),
+        ('>', '&gt;'),
+        ('&', '&amp;'),
+        (r'\^', '&circ;'),
+        ]
+
+    # regular expressions, compiled on first use
+    re_pre = lazy_re(r'(<pre\b.*?</pre>)', re.S)
+    re_space = lazy_re(r'\s+')
+    re_block = lazy_re(r' ?(</?(?:html|head|body|meta|link|title|table|tr|td|th|p|ul|li|h1|h2|h3|hr|address|pre)\b[^>]*>) ?')
+
+    # inline styles, with minify they are rules in help2doc.css and the
+    # elements refer to them by class
+    styles = {
+        'col1': 'white-space: nowrap;',
+        'examples': 'width: 90%;',
+        'function': 'color:red',
+        'comment': 'color:blue',
+        'keyword': 'color:#a020f0',
+        'string': 'color:#a31515',
+        'generated': 'text-align:right',
+        }
+
+    stylesheet = 'help2doc.css'
+
+    def options(self):
+        return repr((self.__class__.__name__, self.matlab, getattr(self, 'toolboxname', None), self.minify,
+                     self.chrome.digest))
+
+    def style(self, name, cls=None):
+        # attributes for an element styled by the rule name
+        if self.minify:
+            return 'class="%s"' % name
+        elif cls:
+            return 'style="%s" class="%s"' % (self.styles[name], cls)
+        else:
+            return 'style="%s"' % self.styles[name]
 
-    def substitutions(self, s):
-        # HTML specific fixups
-        s = s.replace('<', '&lt;')
-        s = s.replace('>', '&gt;')
-        s = s.replace('&', '&amp;')
-        s = s.replace('^', '&circ;')
+    def stylesheet_link(self):
+        if self.minify:
+            return '    <link rel="stylesheet" href="%s">\n' % self.href(os.path.join(self.layout.root(self.here), self.stylesheet))
+        else:
+            return ''
+
+    def write_stylesheet(self):
+        css = ''.join('.%s {%s}\n' % (name, self.styles[name]) for name in sorted(self.styles))
+        self.writefile(self.stylesheet, css)
+        self.record(self.stylesheet)
+
+    def compact(self, html):
+        # collapse whitespace, except inside <pre>, and drop it around
+        # block level tags where it does not render
+        parts = self.re_pre.split(html)
+        for i in range(0, len(parts), 2):
+            s = self.re_block.sub(r'\1', self.re_space.sub(' ', parts[i]))
+            if i > 0:
+                s = s.lstrip()
+            if i < len(parts) - 1:
+                s = s.rstrip()
+            parts[i] = s
+        return ''.join(parts).strip() + '\n'
+
+    def writefile(self, outfile, data):
+        if self.minify and outfile.endswith('.html'):
+            data = self.compact(data)
+        super(GenHTML, self).writefile(outfile, data)
+        for (suffix, compress) in self.compressors:
+            super(GenHTML, self).writefile(outfile + suffix, compress(data))
 
-        return s
+    def done(self):
+        pass
 
     def emphFunction(self, s):
-        return '<span style="color:red">%s</span>' % s
+        return '<span %s>%s</span>' % (self.style('function'), s)
 
     def emphVar(self, s):
         return '<strong>%s</strong>' % s
@@ -40,61 +142,28 @@ class GenHTML(GenHelp):
 
     @trace
     def startModule(self, funcname, text, tag=None, titlebar=False, ismethod=False):
-        def gen_titlebar(funcname):
-            if self.matlab:
-                out = '''<html>
-  <head>
-    <meta http-equiv="Content-Type" content="text/html; charset=utf-8">
-    <link rel="stylesheet" href="http://www.petercorke.com/RVC/common/toolboxhelp.css">
-    <title>M-File Help: %(function)s</title>
-  </head>
-  <body>
-  <table border="0" cellspacing="0" width="100%%">
-    <tr class="subheader">
-      <td class="headertitle">M-File Help: %(function)s</td>
-      <td class="subheader-left"><a href="matlab:open %(function)s">View code for %(function)s</a></td>
-    </tr>
-  </table>
-''' % {'function' : funcname}
-
-            else:
-                out = '''<html>
-  <head>
-    <meta http-equiv="Content-Type" content="text/html; charset=utf-8">
-    <link rel="stylesheet" href="http://www.petercorke.com/RVC/common/toolboxhelp.css">
-    <title>%(function)s</title>
-  </head>
-  <body>
-''' % {'function' : funcname}
-
-            return out
-
         # create HTML header block + title bar
         if titlebar:
-            self.out += gen_titlebar(funcname)
+            self.out += self.chrome.render('titlebar_matlab.html' if self.matlab else 'titlebar.html',
+                                           function=funcname, stylesheet=self.stylesheet_link())
         if tag:
             self.out += '<a name="%s">' % tag
+            self.anchors.append(tag)
         self.out += '<h1>%s</h1>' % funcname
         if tag:
             self.out += '</a>\n'
         #out += '<p><span class="helptopic">%s</span>  %s</p>' % (funcname, split_first_word(text[0])[1])
-        self.out += '<p><span class="helptopic">%s</span></p>' % (split_first_word(text[0])[1])
+        self.out += '<p><span class="helptopic">%s</span></p>' % (split_first_word(text)[1])
         self.vars = set()
 
     def endModule(self):
         self.out += '<hr>\n'
-        today = date.today()
-        out = '<address style="text-align:right">Generated %s by <strong><a href="xx">%s</a></strong> &copy; 2014 Peter Corke</address>\n' % (today.isoformat(), sys.argv[0])
         if self.matlab:
-            self.out += '''
-<table border="0" width="100%" cellpadding="0" cellspacing="0">
-  <tr class="subheader" valign="top"><td>&nbsp;</td></tr></table>
-<p class="copy">&copy; 1990-2014 Peter Corke.</p>
-</body></html>'''
+            self.out += self.chrome.render('footer_matlab.html', toolboxurl=self.toolboxurl,
+                                           toolboxname=self.toolboxname)
         else:
-            self.out += '''
-<p class="copy"><a href="%s">%s</a> &copy; 1990-2014 Peter Corke.</p>
-</body></html>''' % (self.toolboxurl, self.toolboxname)
+            self.out += self.chrome.render('footer.html', toolboxurl=self.toolboxurl,
+                                           toolboxname=self.toolboxname)
 
     @trace
     def endMethod(self):
@@ -110,19 +179,22 @@ class GenHTML(GenHelp):
 
     @trace
     def addTable(self, col1, col2):
-        self.out += '  <tr><td style="white-space: nowrap;" class="col1">%s</td> <td>%s</td></tr>\n' % (col1, col2)
+        self.out += '  <tr><td %s>%s</td> <td>%s</td></tr>\n' % (self.style('col1', 'col1'), col1, col2)
 
     @trace
     def addTableSep(self):
         self.out += '  <tr></tr>\n  <tr></tr>'
 
+    def methodLink(self, classname, method):
+        return '<a href="%s">%s</a>' % (self.href(self.link(classname + '.' + method)), method)
+
     @trace
     def endTable(self):
         self.out += '</table>\n'
 
     @trace
     def startCode(self):
-        self.out += '<pre style="width: 90%%;" class="examples">\n'
+        self.out += '<pre %s>\n' % self.style('examples', 'examples')
 
     @trace
     def addCode(self, text):
@@ -149,9 +221,10 @@ class GenHTML(GenHelp):
         self.out += '<p>\n'
 
     @trace
-    def addPara(self, text, **args):
+    def addPara(self, text, definition, **args):
         self.startPara()
-        self.findvars(text, classname=args['classname'])
+        if definition:
+            self.out += '<code>%s</code>' % definition
         s =  self.transform(text, **args)
         self.out += s + '\n\n'
         self.endPara()
@@ -170,51 +243,74 @@ class GenHTML(GenHelp):
         if self.alsoCount > 0:
             self.out += ', '
         if self.matlab:
-            self.out += '<a href="%s.html">%s</a>' % (text,text)
+            self.out += '<a href="%s">%s</a>' % (self.href(self.link(text)), text)
         else:
-            self.out += '<a href="%s.html">%s</a>' % (text,text)
+            self.out += '<a href="%s">%s</a>' % (self.href(self.link(text)), text)
         self.alsoCount += 1
 
     @trace
     def endAlso(self):
         self.endPara()
 
-    # Generate code document for a regular m-file
-    def format_code(self, filename, pname=None):
-
-        def fixspace(s):
-            return s.replace(' ', '&nbsp;')
-
-        re_comment = re.compile(r'(%.*)$')
-
-        # open the output file
-        outfile = os.path.splitext(filename.lstrip('@'))[0]+'_code.html'
-        out = open(outfile, 'w')
-
+    def code_links(self, filename, text):
+        # the names format_code() links, and where to
+        import mlexer
         funcname = os.path.splitext(os.path.basename(filename))[0]
+        links = set()
+        for tokens in mlexer.lex(text):
+            for (kind, s) in tokens:
+                if kind == 'name' and s != funcname:
+                    links.add((s, self.code_link(s)))
+        return sorted(links)
 
-        out.write('''<html>
-      <head>
-        <meta http-equiv="Content-Type" content="text/html; charset=utf-8">
-        <link rel="stylesheet" href="http://www.petercorke.com/RVC/common/book.css">
-        <title>M-File Help: %(function)s</title>
-      </head>
-      <body>
-    ''' % {'function' : funcname})
+    # Generate code document for a regular m-file
+    def format_code(self, filename, pname=None, text=None):
+        # the code listing, highlighted by mlexer, with calls to the
+        # functions of the run linked to their pages
+        import mlexer
 
-        with open(filename, 'r') as f:
-            out.write('<h1>%s</h1>' % funcname)
-            out.write('<table class="codelistingtable">')
+        # the output file
+        outfile = self.codefile(filename)
+        out = []
 
-            for (num,line) in enumerate(f):
-                line = line.replace(' ', '&nbsp;')
-                line = re_comment.sub('<span style="color:blue">\\1</span>', line)
-                out.write('<tr><td class="codelistingnum">%d</td><td><pre class="codelistingcode">%s</pre></td></tr>\n' % (num+1, line))
+        funcname = os.path.splitext(os.path.basename(filename))[0]
 
-            out.write('</table>\n')
-            today = date.today()
-            out.write('<hr><address style="text-align:right">Generated %s by <strong><a href="xx">%s</a></strong> &copy; 2014 Peter Corke</address>\n' % (today.isoformat(), pname))
-            out.write('</body></html>\n')# =============================================================================
+        out.append(self.chrome.render('code_header.html', function=funcname,
+                                      stylesheet=self.stylesheet_link()))
+
+        if text is None:
+            with open(filename, 'r') as f:
+                text = f.read()
+
+        out.append('<h1>%s</h1>' % funcname)
+        out.append('<table class="codelistingtable">')
+
+        spans = {}
+        for kind in ('comment', 'keyword', 'string'):
+            spans[kind] = '<span %s>' % self.style(kind)
+        for (num, tokens) in enumerate(mlexer.lex(text)):
+            line = []
+            for (kind, s) in tokens:
+                if kind == 'space':
+                    s = s.replace(' ', '&nbsp;')
+                elif kind == 'name':
+                    if s != funcname:
+                        link = self.code_link(s)
+                        if link:
+                            s = '<a href="%s">%s</a>' % (self.href(link), s)
+                elif kind in spans:
+                    s = spans[kind] + code_escape(s) + '</span>'
+                elif kind == 'text':
+                    s = code_escape(s)
+                line.append(s)
+            out.append('<tr><td class="codelistingnum">%d</td><td><pre class="codelistingcode">%s</pre></td></tr>\n' % (num+1, ''.join(line)))
+
+        out.append('</table>\n')
+        out.append(self.chrome.render('code_footer.html', style=self.style('generated'),
+                                      date=date.today().isoformat(), program=str(pname)))
+        out = ''.join(out)
+        self.writefile(outfile, out)
+        return out# =============================================================================
 # GenMD subclass to create MarkDown output
 # =============================================================================
 
@@ -0,0 +1,207 @@
+from GenText import * # file parser and text rendering
+import json
+
+# =============================================================================
+# GenJSON subclass to create structured JSON output
+# =============================================================================
+#
+# Each module is written as one JSON object on a single line, so a page is
+# a valid .json file and the pages of a toolbox concatenate into a JSON
+# Lines file:
+#
+# {"module": "Quaternion",
+#  "entries": [
+#    {"name": "Quaternion", "tag": null, "summary": "Quaternion class",
+#     "signatures": ["Q = Quaternion(V)"], "vars": ["Q", "V"],
+#     "blocks": [{"type": "para", "definition": "Q = Quaternion(V)", "text": "is a quaternion."},
+#                {"type": "heading", "text": "Methods"},
+#                {"type": "table", "rows": [["plot", "plot the quaternion"], ...]},
+#                {"type": "code", "lines": [...]},
+#                {"type": "list", "items": ["text", {"type": "list", "items": [...]}, ...]},
+#                {"type": "seealso", "names": ["rotx", "Quaternion.inv"]}]},
+#    {"name": "Quaternion.plot", "tag": "plot", ...},
+#    {"name": "RTBPose.dim", "tag": "dim", "inherited_from": "RTBPose", ...}],
+#  "referenced_by": ["rotx"]}
+#
+# The entries are the module and then each of its methods.  vars are the
+# variables found by findvars() in the signatures of the entry, as bare
+# identifiers.  Text is plain, without markup.
+
+class GenJSON(GenHelp):
+
+    # a module is one document built up event by event
+    parallel = False
+
+    suffix = '.json'
+
+    re_identifier = lazy_re(r'[A-Za-z]\w*\Z')
+
+    def __init__(self, **kwargs):
+        super(GenJSON, self).__init__(**kwargs)
+        self.doc = None
+        self.entry = None
+        self.para = None
+        self.lists = []
+        self.inherited = None
+
+    def emphFunction(self, s):
+        return s
+
+    def emphVar(self, s):
+        return s
+
+    def emphPath(self, s):
+        return s
+
+    def block(self, block):
+        if self.entry is None:
+            # text before the H1 line
+            self.startModule(self.funcname, '')
+        self.entry['blocks'].append(block)
+        return block
+
+    def close_entry(self):
+        if self.entry is not None:
+            # a signature like S.go(X) leaves the . on S
+            names = set(var.strip('.,;: ') for var in self.vars)
+            self.entry['vars'] = sorted(name for name in names if self.re_identifier.match(name))
+            self.entry = None
+
+    #-------------------- MODULE
+    @trace
+    def startModule(self, funcname, text, tag=None, titlebar=False, ismethod=False):
+        self.close_entry()
+        if self.doc is None:
+            self.doc = {'module': funcname, 'entries': []}
+        self.entry = {
+            'name': funcname,
+            'tag': tag,
+            'summary': split_first_word(text)[1],
+            'signatures': [],
+            'vars': [],
+            'blocks': [],
+            }
+        if self.inherited:
+            self.entry['inherited_from'] = self.inherited
+        self.doc['entries'].append(self.entry)
+        self.vars = set()
+
+    def endModule(self):
+        self.close_entry()
+        if self.doc is not None:
+            try:
+                self.out += json.dumps(self.doc, sort_keys=True) + '\n'
+            except UnicodeDecodeError:
+                # not UTF-8, MATLAB files are often Latin-1
+                self.out += json.dumps(self.doc, sort_keys=True, encoding='latin-1') + '\n'
+        self.doc = None
+        self.inherited = None
+
+    @trace
+    def endMethod(self):
+        self.close_entry()
+
+    @trace
+    def startInherited(self, classname):
+        self.close_entry()
+        self.inherited = classname
+
+    @trace
+    def endInherited(self):
+        self.close_entry()
+        self.inherited = None
+
+    @trace
+    def referencedBy(self, names):
+        if self.doc is not None:
+            self.doc['referenced_by'] = list(names)
+
+    @trace
+    def heading(self, text):
+        self.block({'type': 'heading', 'text': text})
+
+    #-------------------- TABLE
+    @trace
+    def startTable(self):
+        self.table = self.block({'type': 'table', 'rows': []})
+
+    @trace
+    def addTable(self, col1, col2):
+        rows = self.table['rows']
+        if not col1 and col2 and rows and rows[-1][1]:
+            # continuation of the previous description
+            rows[-1][1] += ' ' + self.transform(col2)
+        else:
+            rows.append([col1, self.transform(col2)])
+
+    @trace
+    def addTableSep(self):
+        pass
+
+    @trace
+    def endTable(self):
+        self.table = None
+
+    #-------------------- CODE
+    @trace
+    def startCode(self):
+        self.code = self.block({'type': 'code', 'lines': []})
+
+    @trace
+    def addCode(self, text):
+        self.code['lines'].append(text)
+
+    @trace
+    def endCode(self):
+        self.code = None
+
+    #-------------------- LIST
+    @trace
+    def startList(self):
+        block = {'type': 'list', 'items': []}
+        if self.lists:
+            # nested in the enclosing list
+            self.lists[-1]['items'].append(block)
+        else:
+            self.block(block)
+        self.lists.append(block)
+
+    @trace
+    def addList(self, text):
+        self.lists[-1]['items'].append(self.transform(text))
+
+    @trace
+    def endList(self):
+        self.lists.pop()
+
+    #-------------------- PARAGRAPH
+    @trace
+    def startPara(self):
+        self.para = None
+
+    @trace
+    def addPara(self, text, definition, **args):
+        text = self.transform(text, **args).strip()
+        if self.para is None:
+            self.para = self.block({'type': 'para', 'definition': definition, 'text': text})
+            if definition:
+                self.entry['signatures'].append(definition)
+        else:
+            self.para['text'] = (self.para['text'] + ' ' + text).strip()
+
+    @trace
+    def endPara(self):
+        self.para = None
+
+    #-------------------- SEE ALSO
+    @trace
+    def startAlso(self):
+        self.also = self.block({'type': 'seealso', 'names': []})
+
+    @trace
+    def addAlso(self, text):
+        self.also['names'].append(text)
+
+    @trace
+    def endAlso(self):
+        self.also = None
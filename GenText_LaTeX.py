@@ -4,23 +4,25 @@ from GenText import * # file parser and text rendering
 # GenLatex subclass
 # =============================================================================
 class GenLaTeX(GenHelp):
+    # regular expressions, compiled on first use
+    re_squote = lazy_re(r"(\A|\s)'(.*?)'(\Z|[^a-zA-Z])")
+    re_dquote = lazy_re(r'"(.*?)"')
+    re_dims2 = lazy_re(r'\b([0-9A-Z]+([+-][A-Z0-9]+)?)x([0-9A-Z]+([+-][A-Z0-9]+)?)\b')
+    re_dims3 = lazy_re(r'\b([0-9A-Z]+([+-][A-Z0-9]+)?)x([0-9A-Z]+([+-][A-Z0-9]+)?)x([0-9A-Z]+([+-][A-Z0-9]+)?)\b')
+    re_exp0 = lazy_re(r'([RP])\^([0-9a-zA-Z]+)')
+    re_exp1 = lazy_re(r'\^([0-9a-zA-Z]+)')
+    re_exp2 = lazy_re(r'[^{}]\^[^{}]')
+    re_pi = lazy_re(r'(?<![A-Za-z\\])pi(?![A-Za-z])')
+    re_url = lazy_re(r'(https?://[a-zA-Z0-9/._?=-]+)')
+    re_firstcircumflex = lazy_re(r'\A\s*\^')
+
     def __init__(self, include=True, **kwargs):
         super(GenLaTeX, self).__init__(**kwargs)
 
-        self.re_squote = re.compile(r"(\A|\s)'(.*?)'(\Z|[^a-zA-Z])")
-        self.re_dquote = re.compile(r'"(.*?)"')
-        self.re_dims2 = re.compile(r'\b([0-9A-Z]+([+-][A-Z0-9]+)?)x([0-9A-Z]+([+-][A-Z0-9]+)?)\b')
-        self.re_dims3 = re.compile(r'\b([0-9A-Z]+([+-][A-Z0-9]+)?)x([0-9A-Z]+([+-][A-Z0-9]+)?)x([0-9A-Z]+([+-][A-Z0-9]+)?)\b')
-        self.re_exp0 = re.compile(r'([RP])\^([0-9a-zA-Z]+)')
-        self.re_exp1 = re.compile(r'\^([0-9a-zA-Z]+)')
-        self.re_exp2 = re.compile(r'[^{}]\^[^{}]')
         #self.re_exp2 = re.compile(r'[^}]?\^[^{}]')
         #self.re_exp = re.compile(r'([a-zA-Z]\w*)\^([0-9a-zA-Z]+)')
         #self.re_exp = re.compile(r'\b([a-zA-Z]\w*)\^([0-9]+)\b')
-        self.re_pi = re.compile(r'(?<![A-Za-z\\])pi(?![A-Za-z])')
         self.include = include
-        self.re_url = re.compile(r'(https?://[a-zA-Z0-9/._?=-]+)')
-        self.re_firstcircumflex = re.compile(r'\A\s*\^')
 
         if not self.include:
             self.out += r'''\documentclass[a4paper]{article}
@@ -54,8 +56,9 @@ class GenLaTeX(GenHelp):
             self.out += '\\end{document}\n'
 
 
-    def substitutions(self, s):
-        # LaTeX specific fixups
+    def plain(self, s):
+        # LaTeX specific fixups, each rewrites the output of those before it
+        # so they are not inline rules
 
         # braces
         s = s.replace('{', '$\\{$')
@@ -143,6 +146,7 @@ class GenLaTeX(GenHelp):
     @trace
     def startModule(self, funcname, text, tag=None, titlebar=False, ismethod=False):
         self.vars = set()
+        self.anchors.append(funcname)
         #print 'startMod', funcname, self.transform(funcname), self.vars
         # _ -> \_
         funcname = funcname.replace('_', '\\_')
@@ -240,6 +244,7 @@ class GenLaTeX(GenHelp):
             self.out += ', '
         # _ -> \_
         text2 = text.replace('_', '\\_')
+        self.href('#' + text)
         self.out += '\hyperlink{%s}{\\color{blue} %s}' % (text, text2)
         self.alsoCount += 1
 
@@ -1,4 +1,6 @@
 from GenText import * # file parser and text rendering
+import GenText
+import chrome
 
 # =============================================================================
 # GenMD subclass to create MarkDown output
@@ -6,14 +8,27 @@ from GenText import * # file parser and text rendering
 
 class GenMarkDown(GenHelp):
 
-    def __init__(self, matlab=False, toolbox=None, jekyll=False, **kwargs):
+    suffix = '.md'
+
+    # MarkDown specific fixups
+    inline = [
+        # pipe character confuses GH markdown
+        (r'\|', '&vert;'),
+        # NxM -> N &times; M
+        (r'(\b[0-9A-Z]+)x([0-9A-Z]+)\b', r'\1&times;\2'),
+        # NxMxK -> N &times; M &times; K
+        (r'(\b[0-9A-Z]+)x([0-9A-Z]+)x([0-9A-Z]+)\b', r'\1&times;\2&times; \3'),
+        # A^2 -> A<sup>2</sup>
+        (r'\^([0-9a-zA-Z-]+)', r'<sup>\1</sup>'),
+        ('\n', ' '),
+        ]
+
+    def __init__(self, matlab=False, toolbox=None, jekyll=False, templates=None, **kwargs):
         super(GenMarkDown, self).__init__(**kwargs)
         self.matlab = matlab
-        self.re_dims2 = re.compile(r'(\b[0-9A-Z]+)x([0-9A-Z]+)\b')
-        self.re_dims3 = re.compile(r'(\b[0-9A-Z]+)x([0-9A-Z]+)x([0-9A-Z]+)\b')
-        self.re_exp = re.compile(r'\^([0-9a-zA-Z-]+)')
-        self.re_exp2 = re.compile(r'[^{}]\^[^{}]')
         self.jekyll = jekyll
+        # front matter and code page chrome, from the folder templates
+        self.chrome = chrome.load(templates)
 
         if toolbox == 'rtb':
             self.toolboxname = "Robotics Toolbox for MATLAB"
@@ -22,27 +37,14 @@ class GenMarkDown(GenHelp):
             self.toolboxname = "Machine Vision Toolbox for MATLAB"
             self.toolboxurl = "http://www.petercorke.com/vision"
 
-    def done(self):
-        pass
-
-    def substitutions(self, s):
-        # MarkDown specific fixups
-
-        # pipe character confuses GH markdown
-        s = s.replace('|', '&vert;')
+    code_suffix = '_code.md'
 
-        # NxM -> N &times; M
-        s = self.re_dims2.sub(r'\1&times;\2', s)
+    def options(self):
+        return repr((self.__class__.__name__, self.matlab, self.jekyll, getattr(self, 'toolboxname', None),
+                     self.chrome.digest))
 
-        # NxMxK -> N &times; M &times; K
-        s = self.re_dims3.sub(r'\1&times;\2&times; \3', s)
-
-        # A^2 -> A<sup>2</sup>
-        s = self.re_exp.sub(r'<sup>\1</sup>', s)
-
-        s = s.replace('\n', ' ')
-
-        return s
+    def done(self):
+        pass
 
     def emphFunction(self, s):
         return '**%s**' % s
@@ -59,7 +61,7 @@ class GenMarkDown(GenHelp):
 
         # for Jekyll static page generator need to add special header, simple version here
         if self.jekyll:
-            self.out += '---\n---\n'
+            self.out += self.chrome.render('front_matter.md')
         self.out += '# %s\n' % funcname
 
         self.out += '_%s_\n' % (split_first_word(text)[1])
@@ -90,6 +92,13 @@ class GenMarkDown(GenHelp):
     def endTable(self):
         self.out += '\n\n'
 
+    def methodTable(self, classname, methods):
+        # a code span cannot hold a link, so the link holds the code span
+        self.startTable()
+        for (method, summary) in methods:
+            self.out += '| [`%s`](%s) | %s |\n' % (method, self.href(self.link(classname + '.' + method)), summary)
+        self.endTable()
+
     #-------------------- CODE
     @trace
     def startCode(self):
@@ -150,7 +159,7 @@ class GenMarkDown(GenHelp):
     def addAlso(self, text):
         if self.alsoCount > 0:
             self.out += ', '
-        self.out += '[%s](%s.md)' % (text,text)
+        self.out += '[%s](%s)' % (text, self.href(self.link(text)))
         self.alsoCount += 1
 
     @trace
@@ -164,57 +173,138 @@ class GenMarkDown(GenHelp):
 
 
     # Generate code document for a regular m-file
-    def format_code(self, filename, pname=None):
+    def format_code(self, filename, pname=None, text=None):
 
-        # open the output file
-        outfile = os.path.splitext(filename.lstrip('@'))[0]+'_code.md'
-        out = open(outfile, 'w')
+        # the output file
+        outfile = self.codefile(filename)
+        out = []
 
         funcname = os.path.splitext(os.path.basename(filename))[0]
 
-        out.write('''
-        ## M-File Help: %(function)s
-    ''' % {'function' : funcname})
-
-        with open(filename, 'r') as f:
-            out.write('# %s\n' % funcname)
-            out.write('```matlab\n')
-
-            for (num,line) in enumerate(f):
-                out.write(line+'\n')
-
-            out.write('```\n')
-            today = date.today()
-            out.write('---\nGenerated %s by *%s &copy; 2019 Peter Corke\n' % (today.isoformat(), pname))
+        out.append(self.chrome.render('code_header.md', function=funcname))
+
+        if text is None:
+            with open(filename, 'r') as f:
+                text = f.read()
+
+        out.append('# %s\n' % funcname)
+        out.append('```matlab\n')
+
+        for (num,line) in enumerate(StringIO(text)):
+            out.append(line+'\n')
+
+        out.append('```\n')
+        out.append(self.chrome.render('code_footer.md', date=date.today().isoformat(), program=str(pname)))
+        out = ''.join(out)
+        self.writefile(outfile, out)
+        return out
+
+    def write_indices(self, all, bytag, prefix='', jekyll=False, pagesize=500):
+        # write the index of all functions and an index per tag.  An index
+        # longer than pagesize is split, the index of all functions into a
+        # page per initial letter, and any page that is still too long into
+        # numbered pages.  Only pages whose contents changed are written.
+        # The indices are in the output folder, they link to the pages where
+        # the layout puts them.  Pages left over from a longer index are
+        # removed by --prune, through the list of files the run owns
+        self.index_prefix = prefix
+        self.index_jekyll = jekyll
+        self.index_pagesize = pagesize
+
+        # sort once, the per tag lists are picked out of the sorted list
+        funcs = sorted(all.keys())
+        tags = {}
+        for (tag, tagfuncs) in bytag.items():
+            for func in tagfuncs:
+                tags.setdefault(func, []).append(tag)
+        bytag = dict((tag, []) for tag in bytag)
+        for func in funcs:
+            for tag in tags.get(func, ()):
+                bytag[tag].append(func)
 
-    def write_indices(self, all, bytag, prefix='', jekyll=False):
         # make the alphabetic list
-        print all
-        funcs = sorted(all.keys())
-        with open('TOC_ALL.md', 'w') as f:
-            if jekyll:
-                f.write('---\n---\n')
-            f.write('# All functions\n')
-            f.write('\n| Function | Description|\n|---|---|\n')
+        if len(funcs) <= pagesize:
+            self.write_index('TOC_ALL', 'All functions', funcs, all)
+        else:
+            letters = []
             for func in funcs:
-                f.write("|[`%s`](%s.html) | %s |\n" % (func, os.path.join(prefix,func), all[func]))
+                letter = func[0].upper()
+                if not letters or letters[-1][0] != letter:
+                    letters.append((letter, []))
+                letters[-1][1].append(func)
+            for (letter, letterfuncs) in letters:
+                self.write_index('TOC_ALL_%s' % letter, 'All functions: %s' % letter,
+                                 letterfuncs, all, self.letter_nav(letters, letter))
+            out = self.index_header('All functions')
+            out.append('\n' + self.letter_nav(letters) + '\n')
+            for (letter, letterfuncs) in letters:
+                out.append(' * [%s](%s) %d functions\n' % (letter,
+                    self.href(os.path.join(prefix, 'TOC_ALL_%s.html' % letter)), len(letterfuncs)))
+            self.write_page('TOC_ALL.md', out)
 
         # make the per tag indices
-        for tag in bytag.keys():
-            funcs = sorted(bytag[tag])
-            with open('TOC_%s.md' % (tag,), 'w') as f:
-                if jekyll:
-                    f.write('---\n---\n')
-                f.write('# %s functions\n' % (tag,))
-                f.write('\n| Function | Description|\n|---|---|\n')
-                for func in funcs:
-                 f.write("|[`%s`](%s.html) | %s |\n" % (func, os.path.join(prefix,func), all[func]))
-
-        with open('TOC.md', 'w') as f:
-            if jekyll:
-                f.write('---\n---\n')
-            f.write('# Function indices\n\n')
-            f.write(" * [All functions](%s)\n" % (os.path.join(prefix,'TOC_ALL.html'),))
-            f.write(" * By tag:\n")
-            for tag in sorted(bytag.keys()):
-                f.write("   - [%s related](%s)\n" % (tag, os.path.join(prefix, 'TOC'+tag+'.html')))
\ No newline at end of file
+        for tag in sorted(bytag.keys()):
+            self.write_index('TOC_%s' % tag, '%s functions' % tag, bytag[tag], all)
+
+        out = self.index_header('Function indices')
+        out.append('\n')
+        out.append(" * [All functions](%s)\n" % (self.href(os.path.join(prefix,'TOC_ALL.html')),))
+        out.append(" * By tag:\n")
+        for tag in sorted(bytag.keys()):
+            out.append("   - [%s related](%s)\n" % (tag, self.href(os.path.join(prefix, 'TOC_'+tag+'.html'))))
+        self.write_page('TOC.md', out)
+
+    def index_header(self, title):
+        out = []
+        if self.index_jekyll:
+            out.append('---\n---\n')
+        out.append('# %s\n' % title)
+        return out
+
+    def letter_nav(self, letters, current=None):
+        nav = []
+        for (letter, funcs) in letters:
+            if letter == current:
+                nav.append('**%s**' % letter)
+            else:
+                nav.append('[%s](%s)' % (letter,
+                    self.href(os.path.join(self.index_prefix, 'TOC_ALL_%s.html' % letter))))
+        return ' '.join(nav) + '\n'
+
+    def write_index(self, name, title, funcs, all, nav=None):
+        # a table of funcs, on as many pages as needed: name.md, name_2.md...
+        size = self.index_pagesize
+        pages = ['%s' % name] + ['%s_%d' % (name, i+1) for i in range(1, (len(funcs) - 1) // size + 1)]
+        for (i, page) in enumerate(pages):
+            out = self.index_header(title)
+            if nav:
+                out.append('\n' + nav)
+            if len(pages) > 1:
+                links = []
+                for (j, other) in enumerate(pages):
+                    if i == j:
+                        links.append('**%d**' % (j+1))
+                    else:
+                        links.append('[%d](%s)' % (j+1,
+                            self.href(os.path.join(self.index_prefix, other + '.html'))))
+                out.append('\nPage ' + ' '.join(links) + '\n')
+            out.append('\n| Function | Description|\n|---|---|\n')
+            for func in funcs[i*size:(i+1)*size]:
+                out.append("|[`%s`](%s) | %s |\n" % (func, self.href(os.path.join(self.index_prefix, self.layout.path(func)) + '.html'), all[func]))
+            self.write_page(page + '.md', out)
+
+    def write_page(self, filename, out):
+        # write an index page if it changed
+        data = ''.join(out)
+        path = self.outpath(filename)
+        try:
+            with open(path, 'r') as f:
+                unchanged = f.read() == data
+        except IOError:
+            unchanged = False
+        if not unchanged:
+            with open(path, 'w') as f:
+                f.write(data)
+        if GenText.outputs is not None:
+            GenText.outputs.add(path, data)
+        self.record(filename)
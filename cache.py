@@ -0,0 +1,126 @@
+# cache module
+#
+# A content addressed store shared by any number of runs, workspaces or
+# concurrent jobs.  Entries are keyed by a hash of everything that
+# determines them: the source bytes, the backend and its options, and the
+# help2doc code itself, so an entry never goes stale, it just stops being
+# asked for.
+#
+# c = Cache(path, maxsize, extra)
+#   extra are more files, like the code, that every entry depends on
+# k = c.key(part, ...)      hash of the string parts and the help2doc code
+# c.get(k)                  the stored object, or None
+# c.put(k, obj)             obj is plain data: strings, numbers, tuples,
+#                           lists, dictionaries and sets of them
+# c.evict()                 remove least recently used entries until the
+#                           store is under maxsize bytes
+#
+# Entries are marshalled into path/ab/cdef..., written to a temporary file
+# and renamed into place so a reader never sees a partial entry.  The store
+# may be shared by machines that do not trust each other, so an entry is
+# only ever decoded as data, never with pickle, and one that cannot be
+# decoded is a miss.
+
+import os
+import glob
+import hashlib
+import tempfile
+import marshal
+
+
+def code_version(extra=()):
+    # hash of the help2doc sources, any change to them invalidates the cache
+    here = os.path.dirname(os.path.abspath(__file__))
+    h = hashlib.sha1()
+    for file in sorted(glob.glob(os.path.join(here, '*.py')) + [os.path.join(here, 'help2doc')]) + list(extra):
+        with open(file, 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+class Cache(object):
+
+    def __init__(self, path, maxsize=500*1024*1024, extra=()):
+        self.path = path
+        self.maxsize = maxsize
+        self.version = code_version(extra)
+        self.hits = 0
+        self.misses = 0
+        if not os.path.isdir(path):
+            try:
+                os.makedirs(path)
+            except OSError:
+                # another job created it
+                pass
+
+    def key(self, *parts):
+        h = hashlib.sha1(self.version)
+        for part in parts:
+            if isinstance(part, unicode):
+                part = part.encode('utf-8')
+            # length prefix so that parts cannot run together
+            h.update('%d:' % len(part))
+            h.update(part)
+        return h.hexdigest()
+
+    def filename(self, key):
+        return os.path.join(self.path, key[:2], key[2:])
+
+    def get(self, key):
+        filename = self.filename(key)
+        try:
+            with open(filename, 'rb') as f:
+                obj = marshal.load(f)
+        except (IOError, OSError, EOFError, ValueError, TypeError):
+            # missing, evicted by another job, or not an entry
+            self.misses += 1
+            return None
+        try:
+            # most recently used
+            os.utime(filename, None)
+        except OSError:
+            pass
+        self.hits += 1
+        return obj
+
+    def put(self, key, obj):
+        filename = self.filename(key)
+        folder = os.path.dirname(filename)
+        if not os.path.isdir(folder):
+            try:
+                os.makedirs(folder)
+            except OSError:
+                pass
+        (fd, tmp) = tempfile.mkstemp(dir=folder, prefix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                marshal.dump(obj, f, 2)
+            os.rename(tmp, filename)
+        except:
+            os.remove(tmp)
+            raise
+
+    def evict(self):
+        entries = []
+        total = 0
+        for folder in glob.glob(os.path.join(self.path, '??')):
+            for name in os.listdir(folder):
+                filename = os.path.join(folder, name)
+                try:
+                    st = os.stat(filename)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, filename))
+                total += st.st_size
+        if total <= self.maxsize:
+            return
+        # oldest first, down to 90% so that eviction is not needed every run
+        entries.sort()
+        for (mtime, size, filename) in entries:
+            if total <= 0.9 * self.maxsize:
+                break
+            try:
+                os.remove(filename)
+            except OSError:
+                continue
+            total -= size
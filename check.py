@@ -0,0 +1,164 @@
+# check module
+#
+# Lint for the documentation of a toolbox, from the comment blocks and the
+# parse.Parser token stream alone, nothing is rendered.
+#
+# findings = check(path, contents, names, tags)
+#   path       an m-file or an @class folder
+#   contents   its files, as returned by read_sources()
+#   names      lower case names of all the functions of the toolbox, for
+#              See also targets
+#   tags       the known %## tags
+#
+# Each finding is a dictionary: file, line (1-based), kind, name and
+# message.  The kinds are:
+#
+#   undocumented      a function, class or class method with no comment
+#   bad-tag           a %## tag that is not known
+#   signature         a function line that cannot be parsed
+#   list-nesting      a list item that unindents to no enclosing list
+#   table             table rows whose columns do not line up
+#   seealso           a See also target that is not a function of the
+#                     toolbox
+#   no-constructor    a class with no documented constructor
+#
+# The stats of a file are counted in stats, a dictionary of counts.
+
+import os
+
+import parse
+
+
+def finding(findings, file, line, kind, name, message):
+    findings.append({'file': file, 'line': line, 'kind': kind,
+                     'name': name, 'message': message})
+
+
+def check_block(findings, file, start, name, block, names):
+    # walk the token stream of a comment block as GenHelp.format does,
+    # noting what it would get wrong.  start is the index of its first line.
+    # The LIST and TABLE states follow those of GenHelp.format, change them
+    # together
+    parser = parse.Parser(block)
+    i = parser.linenum
+    cur = parser.nextLine()
+    while cur.type != parse.END:
+        if cur.type == parse.LIST:
+            stack = []
+            while True:
+                i = parser.linenum
+                nxt = parser.nextLine()
+                if nxt.same(cur):
+                    continue
+                elif nxt.type == parse.LIST:
+                    if nxt.indent > cur.indent:
+                        stack.append(cur)
+                        cur = nxt
+                    elif stack and nxt.indent == stack[-1].indent:
+                        cur = stack.pop()
+                    else:
+                        finding(findings, file, start + i + 1, 'list-nesting', name,
+                                'list item indented %d matches no enclosing list' % nxt.indent)
+                elif nxt.type == parse.TEXT and nxt.indent == cur.indent:
+                    continue
+                else:
+                    break
+            cur = nxt
+            continue
+
+        elif cur.type == parse.TABLE:
+            while True:
+                i = parser.linenum
+                nxt = parser.nextLine()
+                if nxt.same(cur):
+                    continue
+                elif nxt.type in (parse.TABLESEP, parse.BLANKLINE):
+                    i = parser.linenum
+                    nxt = parser.nextLine()
+                    if nxt.same(cur):
+                        continue
+                elif nxt.type == parse.TEXT and nxt.indent == cur.indent[1]:
+                    continue
+                elif nxt.type == parse.TABLE:
+                    finding(findings, file, start + i + 1, 'table', name,
+                            'table row columns at %d and %d, previous row at %d and %d'
+                            % (nxt.indent[0], nxt.indent[1], cur.indent[0], cur.indent[1]))
+                elif nxt.type == parse.TEXT and cur.indent[0] < nxt.indent < 8:
+                    finding(findings, file, start + i + 1, 'table', name,
+                            'continuation at %d is not aligned with the description at %d'
+                            % (nxt.indent, cur.indent[1]))
+                break
+            cur = nxt
+            continue
+
+        elif cur.type == parse.SEEALSO:
+            for func in cur.text().split(','):
+                func = func.strip()
+                target = func.split('.')[0].lower()
+                if target and target not in names:
+                    finding(findings, file, start + i + 1, 'seealso', name,
+                            'See also %s names no function of the toolbox' % func)
+
+        i = parser.linenum
+        cur = parser.nextLine()
+
+
+def check_file(findings, stats, file, text, names, tags):
+    # check an m-file, a classdef file has its methods checked as well.  The
+    # comment blocks, tags and functions are those parse.mfile gives the
+    # generator
+    name = os.path.splitext(os.path.basename(file))[0]
+    # a class as Module finds it, the classdef line usually ends the top
+    # comment and so is not yielded by parse.mfile
+    isclass = any(line.lstrip().startswith('classdef') for line in text.split('\n'))
+
+    methods = []
+    for (i, line, comment) in parse.mfile(text):
+        if line is None:
+            stats['functions'] += 1
+            if comment:
+                stats['documented'] += 1
+                check_block(findings, file, 0, name, comment, names)
+            else:
+                finding(findings, file, 1, 'undocumented', name, 'no comment at the top of the file')
+            continue
+        linetags = parse.tags(line)
+        if linetags:
+            for tag in linetags:
+                if tag not in tags:
+                    finding(findings, file, i + 1, 'bad-tag', name, 'unknown tag %s' % tag)
+        elif comment is not None:
+            m = parse.re_function.match(line)
+            if not m:
+                finding(findings, file, i + 1, 'signature', name,
+                        'cannot parse function signature')
+                continue
+            method = m.group('func')
+            if isclass:
+                methods.append(method)
+                stats['functions'] += 1
+                if comment:
+                    stats['documented'] += 1
+                    check_block(findings, file, i + 1, '%s.%s' % (name, method), comment, names)
+                elif not (method.startswith('get.') or method.startswith('set.')):
+                    finding(findings, file, i + 1, 'undocumented', '%s.%s' % (name, method),
+                            'method %s has no comment' % method)
+
+    if isclass and name not in methods:
+        finding(findings, file, 1, 'no-constructor', name,
+                'class %s has no constructor method' % name)
+
+
+def check(path, contents, names, tags):
+    findings = []
+    stats = {'files': 0, 'functions': 0, 'documented': 0}
+    classname = os.path.basename(path)
+    if classname.startswith('@'):
+        classname = classname[1:]
+        if not any(os.path.splitext(os.path.basename(file))[0] == classname for file in contents):
+            finding(findings, path, None, 'no-constructor', classname,
+                    'class %s has no constructor %s.m' % (classname, classname))
+    for file in sorted(contents.keys()):
+        stats['files'] += 1
+        check_file(findings, stats, file, contents[file], names, tags)
+    return (findings, stats)
@@ -0,0 +1,176 @@
+# chrome module
+#
+# The chrome of the pages, the header, title bar and footer around the
+# documentation, as templates a site can replace without changing the
+# backends.
+#
+# t = Template(text)
+#   text with ${field} references, $$ is a $.  It is cut into fragments
+#   once, t.render(fields) joins them with the values of the fields, a
+#   dictionary
+#
+# c = load(folder=None)
+#   the templates of a run, the defaults below with any of them replaced by
+#   the file of the same name in folder.  Templates are loaded and compiled
+#   once per folder however many generators use them
+# c.render(name, **fields)
+# c.digest                  identifies the templates, part of the cache key
+#                           of a page
+#
+# The templates, by the backend that uses them, and their fields:
+#
+#   titlebar.html           head and title bar of a page for the web
+#   titlebar_matlab.html    ... for the MATLAB help browser
+#                             function, stylesheet
+#   footer.html             end of a page for the web
+#                             toolboxname, toolboxurl
+#   footer_matlab.html      ... for the MATLAB help browser
+#   code_header.html        start of a code listing page
+#                             function, stylesheet
+#   code_footer.html        end of a code listing page
+#                             date, program, style
+#   front_matter.md         Jekyll front matter at the start of a module
+#   code_header.md          start of a code listing page
+#                             function
+#   code_footer.md          end of a code listing page
+#                             date, program
+
+import os
+import re
+import hashlib
+
+defaults = {
+
+'titlebar_matlab.html': '''<html>
+  <head>
+    <meta http-equiv="Content-Type" content="text/html; charset=utf-8">
+    <link rel="stylesheet" href="http://www.petercorke.com/RVC/common/toolboxhelp.css">
+${stylesheet}    <title>M-File Help: ${function}</title>
+  </head>
+  <body>
+  <table border="0" cellspacing="0" width="100%">
+    <tr class="subheader">
+      <td class="headertitle">M-File Help: ${function}</td>
+      <td class="subheader-left"><a href="matlab:open ${function}">View code for ${function}</a></td>
+    </tr>
+  </table>
+''',
+
+'titlebar.html': '''<html>
+  <head>
+    <meta http-equiv="Content-Type" content="text/html; charset=utf-8">
+    <link rel="stylesheet" href="http://www.petercorke.com/RVC/common/toolboxhelp.css">
+${stylesheet}    <title>${function}</title>
+  </head>
+  <body>
+''',
+
+'footer_matlab.html': '''
+<table border="0" width="100%" cellpadding="0" cellspacing="0">
+  <tr class="subheader" valign="top"><td>&nbsp;</td></tr></table>
+<p class="copy">&copy; 1990-2014 Peter Corke.</p>
+</body></html>''',
+
+'footer.html': '''
+<p class="copy"><a href="${toolboxurl}">${toolboxname}</a> &copy; 1990-2014 Peter Corke.</p>
+</body></html>''',
+
+'code_header.html': '''<html>
+      <head>
+        <meta http-equiv="Content-Type" content="text/html; charset=utf-8">
+        <link rel="stylesheet" href="http://www.petercorke.com/RVC/common/book.css">
+    ${stylesheet}    <title>M-File Help: ${function}</title>
+      </head>
+      <body>
+    ''',
+
+'code_footer.html': '''<hr><address ${style}>Generated ${date} by <strong><a href="xx">${program}</a></strong> &copy; 2014 Peter Corke</address>
+</body></html>
+''',
+
+'front_matter.md': '''---
+---
+''',
+
+'code_header.md': '''
+        ## M-File Help: ${function}
+    ''',
+
+'code_footer.md': '''---
+Generated ${date} by *${program} &copy; 2019 Peter Corke
+''',
+}
+
+fields = {
+    'titlebar_matlab.html': ('function', 'stylesheet'),
+    'titlebar.html': ('function', 'stylesheet'),
+    'footer_matlab.html': ('toolboxname', 'toolboxurl'),
+    'footer.html': ('toolboxname', 'toolboxurl'),
+    'code_header.html': ('function', 'stylesheet'),
+    'code_footer.html': ('date', 'program', 'style'),
+    'front_matter.md': (),
+    'code_header.md': ('function',),
+    'code_footer.md': ('date', 'program'),
+    }
+
+
+class Template(object):
+
+    re_field = re.compile(r'\$(?:\{(\w+)\}|(\$))')
+
+    def __init__(self, text):
+        # fragments alternate literal text and field names, a literal
+        # first and last
+        self.fragments = []
+        self.fields = set()
+        literal = ''
+        pos = 0
+        for m in self.re_field.finditer(text):
+            literal += text[pos:m.start()]
+            pos = m.end()
+            if m.group(2):
+                literal += '$'
+            else:
+                self.fragments.append(literal)
+                self.fragments.append(m.group(1))
+                self.fields.add(m.group(1))
+                literal = ''
+        self.fragments.append(literal + text[pos:])
+
+    def render(self, fields):
+        out = self.fragments[:]
+        for i in range(1, len(out), 2):
+            out[i] = fields[out[i]]
+        return ''.join(out)
+
+
+class Chrome(object):
+
+    def __init__(self, folder=None):
+        self.templates = {}
+        h = hashlib.sha1()
+        for name in sorted(defaults):
+            text = defaults[name]
+            if folder and os.path.exists(os.path.join(folder, name)):
+                with open(os.path.join(folder, name), 'r') as f:
+                    text = f.read()
+            template = Template(text)
+            unknown = template.fields - set(fields[name])
+            if unknown:
+                raise ValueError('unknown field %s in template %s' % (', '.join(sorted(unknown)), name))
+            self.templates[name] = template
+            h.update(name + '\0' + text + '\0')
+        self.digest = h.hexdigest()
+
+    def render(self, name, **fields):
+        return self.templates[name].render(fields)
+
+
+chromes = {}
+
+def load(folder=None):
+    try:
+        return chromes[folder]
+    except KeyError:
+        chromes[folder] = Chrome(folder)
+        return chromes[folder]
@@ -0,0 +1,96 @@
+# classgraph module
+#
+# The inheritance graph of the classes of a run, from their
+# classdef X < Y & Z lines, and the documentation of their methods so that
+# a subclass page can show the methods it inherits.
+#
+# g = ClassGraph(load)
+# g.add(module)             note a class as it is processed
+# g.superclasses(name)      the direct superclasses of a class
+# g.ancestors(name)         all superclasses, nearest first
+# g.inherited(name)         methods inherited by a class, as a list of
+#                           (superclass, [(method, comment), ...])
+# g.sources(name)           the files of all the superclasses
+#
+# A class that has not been added, typically a base class that sorts after
+# its subclasses or lives outside the files of the run, is found by calling
+# load(name), which returns its Module or None.  Each class is parsed and
+# kept once however many subclasses it has, only the classes themselves are
+# held, not the pages of the run.
+
+class ClassGraph(object):
+
+    def __init__(self, load=None):
+        self.load = load
+        self.classes = {}   # key=class name, value=dict of superclasses, methods, sources or None
+
+    def add(self, module):
+        if not module.isclass or self.classes.get(module.name):
+            return
+        self.classes[module.name] = {
+            'superclasses': module.superclasses,
+            'methods': module.class_methods(),
+            'sources': module.sources(),
+            }
+
+    def get(self, name):
+        try:
+            return self.classes[name]
+        except KeyError:
+            # not seen, a builtin class like handle resolves to None
+            self.classes[name] = None
+            if self.load:
+                module = self.load(name)
+                if module:
+                    self.add(module)
+            return self.classes[name]
+
+    def superclasses(self, name):
+        cls = self.get(name)
+        if cls:
+            return cls['superclasses']
+        else:
+            return []
+
+    def ancestors(self, name):
+        # depth first, left to right, as MATLAB resolves a method
+        ancestors = []
+        stack = list(reversed(self.superclasses(name)))
+        while stack:
+            parent = stack.pop()
+            if parent in ancestors or parent == name:
+                continue
+            ancestors.append(parent)
+            stack.extend(reversed(self.superclasses(parent)))
+        return ancestors
+
+    def inherited(self, name):
+        cls = self.get(name)
+        if not cls:
+            return []
+        # a method defined nearer to the class hides the same method further
+        # up the hierarchy, constructors are not inherited
+        defined = set(cls['methods'].keys())
+        inherited = []
+        for parent in self.ancestors(name):
+            pcls = self.get(parent)
+            if not pcls:
+                continue
+            methods = []
+            for method in sorted(pcls['methods'].keys(), key=str.lower):
+                comment = pcls['methods'][method]
+                if method in defined or method == parent or not comment:
+                    continue
+                defined.add(method)
+                methods.append((method, comment))
+            if methods:
+                inherited.append((parent, methods))
+        return inherited
+
+    def sources(self, name):
+        sources = []
+        for parent in self.ancestors(name):
+            pcls = self.get(parent)
+            if pcls:
+                sources.extend(pcls['sources'])
+        return sources
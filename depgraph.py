@@ -0,0 +1,119 @@
+# depgraph module
+#
+# Records the cross-file dependencies of every generated page so that an
+# incremental run only re-renders the pages that could have changed.
+#
+# A page depends on:
+#  - its sources, the m-file or every m-file in an @class folder, identified
+#    by modification time and size
+#  - the names it looked up with GenHelp.findfile(), since adding, renaming or
+#    deleting a file of that name, or changing its capitalisation, changes
+#    how its See also links render
+#  - the modules listed in its Referenced by section, which change when
+#    another file edits its See also line
+#
+# d = DepGraph(filename)
+# changed = d.update_files(names)    names of .m files now in the toolbox
+# d.relayout(digest)                 forget every page if the layout changed
+# d.stale(page, sources, changed, refby)    True if page must be rendered again
+# d.record(page, sources, names, refby)     after the page has been rendered
+# d.save()
+#
+# A page rendered from part of its sources, one method of a classdef file,
+# passes a digest of that part to stale() and record().  Its sources are then
+# only checked to be the same files, an edit elsewhere in them does not make
+# the page stale.
+#
+# The graph is kept on disk as JSON.
+
+import os
+import json
+
+
+def signature(path):
+    # identify the version of a source file
+    st = os.stat(path)
+    return [st.st_mtime, st.st_size]
+
+
+class DepGraph(object):
+
+    def __init__(self, filename='.help2doc.deps'):
+        self.filename = filename
+        self.pages = {}     # key=page, value={'sources': {path: sig}, 'names': [name], 'refby': [name]}
+        self.files = []     # names of all .m files at the last run
+        self.layout = None  # digest of the layout.Layout of the last run
+
+        if os.path.exists(filename):
+            with open(filename, 'r') as f:
+                state = json.load(f)
+            self.pages = state['pages']
+            self.files = state['files']
+            self.layout = state.get('layout')
+
+    def save(self):
+        with open(self.filename, 'w') as f:
+            json.dump({'pages': self.pages, 'files': self.files, 'layout': self.layout}, f,
+                      indent=1, sort_keys=True)
+
+    def relayout(self, digest):
+        # pages moved by a change of layout, and the links to them, must
+        # all be rendered again
+        if self.layout != digest:
+            self.pages = {}
+            self.layout = digest
+
+    def update_files(self, names):
+        # compare the current set of file names with that of the last run
+        # and return the set of names, lower case, that were added, removed
+        # or renamed.  Names are compared case sensitively, findfile()
+        # resolves a name to the capitalisation of the file, so Foo.m
+        # renamed to foo.m changes the pages that link it
+        old = set(self.files)
+        new = set(names)
+        self.files = sorted(names)
+        return set(name.lower() for name in old ^ new)
+
+    def stale(self, page, sources, changed=frozenset(), refby=(), digest=None):
+        # a page is stale if it was never rendered, if any of its sources
+        # were added, removed or modified, if it looked up a name that
+        # has since been added or removed, or if it is referenced by a
+        # different set of modules
+        try:
+            entry = self.pages[page]
+        except KeyError:
+            return True
+        old = entry['sources']
+        if sorted(old.keys()) != sorted(sources):
+            return True
+        if digest is not None:
+            if entry.get('digest') != digest:
+                return True
+        else:
+            for path in sources:
+                if old[path] != signature(path):
+                    return True
+        if entry.get('refby', []) != sorted(refby):
+            return True
+        return not changed.isdisjoint(entry['names'])
+
+    def record(self, page, sources, names, refby=(), digest=None):
+        self.pages[page] = {
+            'sources': dict((path, signature(path)) for path in sources),
+            'names': sorted(names),
+            'refby': sorted(refby)
+            }
+        if digest is not None:
+            self.pages[page]['digest'] = digest
+
+    def dependents(self, names):
+        # return the pages that looked up any of the given names
+        names = set(name.lower() for name in names)
+        return sorted(page for (page, entry) in self.pages.items()
+                      if not names.isdisjoint(entry['names']))
+
+    def prune(self):
+        # forget pages whose sources have all been deleted
+        for page in list(self.pages.keys()):
+            if not any(os.path.exists(path) for path in self.pages[page]['sources']):
+                del self.pages[page]
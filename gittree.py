@@ -0,0 +1,137 @@
+# gittree module
+#
+# The files of a git revision, read from the object store with git plumbing
+# so that no checkout is needed and a bare mirror will do.
+#
+# t = GitTree(repo, rev)
+#   repo is a folder of the repository, a work tree or a bare repository,
+#   rev any revision git understands.  Paths are repo joined to the path of
+#   the file in the tree, so they look like those of a checkout of rev in
+#   repo, normalized with os.path.normpath
+#
+# t.read(path)              the contents of a file
+# t.isfile(path), t.isdir(path)
+# t.glob(pattern)           paths matching a shell pattern, like glob.glob
+# t.walk(top)               (root, dirs, files) below top, like os.walk
+# t.changed(since)          paths of the files added, changed or deleted
+#                           between revision since and rev
+#
+# The tree is listed once with git ls-tree, blobs are read on demand from a
+# single git cat-file --batch process, which may be shared by threads.
+
+import os
+import fnmatch
+import subprocess
+import threading
+
+
+class GitError(Exception):
+    pass
+
+
+def dirname(path):
+    return os.path.dirname(path) or '.'
+
+
+class GitTree(object):
+
+    def __init__(self, repo, rev='HEAD'):
+        self.repo = repo
+        self.commit = self.git('rev-parse', '--verify', '%s^{commit}' % rev).strip()
+        # a sub folder of a work tree sees the part of the tree below it
+        prefix = self.git('rev-parse', '--show-prefix').strip()
+
+        self.blobs = {}     # key=path, value=blob id
+        self.dirs = {}      # key=path of a folder, value=(set of folders, set of files)
+        self.dirs[self.path('')] = (set(), set())
+        out = self.git('ls-tree', '-r', '-z', '--full-tree', self.commit)
+        for entry in out.split('\0'):
+            if not entry:
+                continue
+            (info, name) = entry.split('\t', 1)
+            (mode, typ, blob) = info.split()
+            if typ != 'blob' or not name.startswith(prefix):
+                # submodules and files outside the folder
+                continue
+            path = self.path(name[len(prefix):])
+            self.blobs[path] = blob
+            self.add(path, False)
+
+        self.batch = None
+        self.lock = threading.Lock()
+
+    def path(self, name):
+        return os.path.normpath(os.path.join(self.repo, name))
+
+    def add(self, path, isdir):
+        # note path in its parent folder, and the parents in theirs
+        parent = dirname(path)
+        if parent not in self.dirs:
+            self.dirs[parent] = (set(), set())
+            self.add(parent, True)
+        self.dirs[parent][0 if isdir else 1].add(os.path.basename(path))
+
+    def git(self, *args):
+        try:
+            p = subprocess.Popen(['git'] + list(args), cwd=self.repo,
+                                 stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        except OSError as e:
+            raise GitError('cannot run git: %s' % e)
+        (out, err) = p.communicate()
+        if p.returncode:
+            raise GitError('git %s: %s' % (args[0], err.strip()))
+        return out
+
+    def read(self, path):
+        try:
+            blob = self.blobs[os.path.normpath(path)]
+        except KeyError:
+            raise IOError('%s is not in %s' % (path, self.commit[:12]))
+        with self.lock:
+            if self.batch is None:
+                self.batch = subprocess.Popen(['git', 'cat-file', '--batch'], cwd=self.repo,
+                                              stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+            self.batch.stdin.write(blob + '\n')
+            self.batch.stdin.flush()
+            # <id> <type> <size> LF <contents> LF
+            (id, typ, size) = self.batch.stdout.readline().split()
+            data = self.batch.stdout.read(int(size))
+            self.batch.stdout.read(1)
+        return data
+
+    def close(self):
+        if self.batch:
+            self.batch.stdin.close()
+            self.batch.wait()
+            self.batch = None
+
+    def isfile(self, path):
+        return os.path.normpath(path) in self.blobs
+
+    def isdir(self, path):
+        return os.path.normpath(path) in self.dirs
+
+    def glob(self, pattern):
+        pattern = os.path.normpath(pattern)
+        folder = dirname(pattern)
+        if folder not in self.dirs:
+            return []
+        (dirs, files) = self.dirs[folder]
+        names = fnmatch.filter(dirs | files, os.path.basename(pattern))
+        return [os.path.normpath(os.path.join(folder, name)) for name in sorted(names)]
+
+    def walk(self, top):
+        top = os.path.normpath(top)
+        if top not in self.dirs:
+            return
+        (dirs, files) = self.dirs[top]
+        dirs = sorted(dirs)
+        yield (top, dirs, sorted(files))
+        for d in dirs:
+            for item in self.walk(os.path.normpath(os.path.join(top, d))):
+                yield item
+
+    def changed(self, since):
+        since = self.git('rev-parse', '--verify', '%s^{commit}' % since).strip()
+        out = self.git('diff-tree', '-r', '-z', '--relative', '--name-only', since, self.commit)
+        return set(self.path(name) for name in out.split('\0') if name)
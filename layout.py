@@ -0,0 +1,96 @@
+# layout module
+#
+# Where the pages of a toolbox go below its output folder.  By default every
+# page is in the output folder, a large site can be sharded into sub folders
+# so that no folder holds more than a few hundred files.
+#
+# l = Layout(scheme, folders=None)
+#   scheme is one of
+#
+#     flat        every page in the output folder
+#     letter      a folder per initial letter, r/rotx.html
+#     hash        a folder per two hex digits of a hash of the name,
+#                 3f/rotx.html
+#     namespace   the package of the function, +robot/+util/f.m goes to
+#                 robot/util/f.html, a function outside a package to the
+#                 output folder
+#     tag         the first %## tag of the function, 3d/rotx.html, the
+#                 folders jtd.py makes for a Just the Docs site
+#
+#   folders maps the lower case name of each function to its folder, for
+#   the namespace and tag schemes
+#
+# l.folder(name)        the folder of the page of name, '' for the output
+#                       folder.  A method page, Class.method, goes with its
+#                       class
+# l.path(name)          the page of name relative to the output folder,
+#                       without suffix
+# l.link(name, here)    the page of name relative to the folder here
+# l.root(here)          the output folder relative to the folder here
+# l.digest              identifies where every page goes
+#
+# namespaces(top, walk) the folders of the namespace scheme for the
+# functions and classes below top
+
+import os
+import hashlib
+
+schemes = ('flat', 'letter', 'hash', 'namespace', 'tag')
+
+
+class Layout(object):
+
+    def __init__(self, scheme='flat', folders=None):
+        if scheme not in schemes:
+            raise ValueError('unknown layout %s' % scheme)
+        self.scheme = scheme
+        self.folders = folders or {}
+        h = hashlib.sha1(scheme)
+        for name in sorted(self.folders):
+            h.update('\0' + name + '\0' + self.folders[name])
+        self.digest = h.hexdigest()
+
+    def folder(self, name):
+        name = name.split('.')[0].lower()
+        if self.scheme == 'flat' or not name:
+            return ''
+        elif self.scheme == 'letter':
+            return name[0]
+        elif self.scheme == 'hash':
+            return hashlib.sha1(name).hexdigest()[:2]
+        else:
+            return self.folders.get(name, '')
+
+    def path(self, name):
+        return os.path.join(self.folder(name), name)
+
+    def link(self, name, here=''):
+        folder = self.folder(name)
+        if folder == here:
+            return name
+        return os.path.join(self.root(here), folder, name)
+
+    def root(self, here):
+        if not here:
+            return ''
+        return os.path.join(*['..'] * (here.count(os.sep) + 1))
+
+
+def namespaces(top, walk=os.walk):
+    # the package folders, +a/+b as a/b, of the m-files and @class folders
+    # below top.  The first of a name found wins, as for See also links
+    folders = {}
+    for (root, dirs, files) in walk(top):
+        parts = os.path.relpath(root, top).split(os.sep)
+        if any(part.startswith('@') for part in parts):
+            # the methods of a class have no pages
+            continue
+        folder = os.path.join(*[''] + [part[1:] for part in parts if part.startswith('+')])
+        for file in files:
+            (name, ext) = os.path.splitext(file)
+            if ext in ('.m', '.mlx'):
+                folders.setdefault(name.lower(), folder)
+        for d in dirs:
+            if d.startswith('@'):
+                folders.setdefault(d[1:].lower(), folder)
+    return folders
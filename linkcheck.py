@@ -0,0 +1,118 @@
+# linkcheck module
+#
+# A check of the links of a generated site against the pages and anchors
+# the run wrote, noted as they were rendered, so no page is read back.
+#
+# m = Manifest()
+# m.add(path, links, anchors)
+#   note a page written at path, the targets of its links, relative to the
+#   page, and the anchors it defines
+#
+# (findings, stats) = check(m, jobs=None)
+#   the broken links, checked on jobs processes (default number of CPUs),
+#   each a dictionary of
+#
+#     page    the page with the link
+#     link    the target as written
+#     kind    missing-page     no page at the target
+#             missing-anchor   the page has no anchor of that name
+#     hint    for a missing page, the link that would work, when a page
+#             has an anchor of that name, as the method of a class on the
+#             page of the class
+#
+#   and stats counts the pages and links checked
+#
+# Links with a scheme, http: or matlab:, and absolute paths are not checked.
+# A MarkDown page may be linked as .html, the name it has on the site.  A
+# target the run did not write, a page that was up to date, is looked for
+# on disk, its anchors are not checked.
+
+import os
+import re
+import multiprocessing
+
+re_external = re.compile(r'[A-Za-z][A-Za-z0-9+.-]*:|/')
+
+
+class Manifest(object):
+
+    def __init__(self):
+        self.pages = {}     # key=path, value=(links, set of anchors)
+
+    def add(self, path, links, anchors):
+        self.pages[os.path.normpath(path)] = (list(links), set(anchors))
+
+    def find(self, path):
+        # the page at path, or the MarkDown page linked as .html, None if
+        # the run did not write it
+        for p in variants(path):
+            if p in self.pages:
+                return p
+        return None
+
+
+def variants(path):
+    # the pages a link to path may mean, a MarkDown page is published as
+    # .html but not the other way round
+    (base, ext) = os.path.splitext(path)
+    if ext == '.html':
+        return [path, base + '.md']
+    return [path]
+
+
+manifest = None     # the manifest, in a worker
+
+
+def check_init(m):
+    global manifest
+    manifest = m
+
+
+def check_page(page):
+    findings = []
+    folder = os.path.dirname(page)
+    for link in manifest.pages[page][0]:
+        if re_external.match(link):
+            continue
+        (target, sep, anchor) = link.partition('#')
+        target = target.split('?')[0]
+        path = os.path.normpath(os.path.join(folder, target)) if target else page
+        found = manifest.find(path)
+        if found is None:
+            if not any(os.path.exists(p) for p in variants(path)):
+                finding = {'page': page, 'link': link, 'kind': 'missing-page'}
+                hint = method_hint(folder, path)
+                if hint:
+                    finding['hint'] = hint
+                findings.append(finding)
+        elif anchor and anchor not in manifest.pages[found][1]:
+            findings.append({'page': page, 'link': link, 'kind': 'missing-anchor'})
+    return findings
+
+
+def method_hint(folder, path):
+    # Class.method.html is the anchor method of Class.html when the
+    # methods are not split into pages of their own
+    (base, ext) = os.path.splitext(path)
+    (classname, dot, method) = base.rpartition('.')
+    if not dot:
+        return None
+    found = manifest.find(classname + ext)
+    if found and method in manifest.pages[found][1]:
+        return os.path.relpath(found, folder) + '#' + method
+    return None
+
+
+def check(m, jobs=None):
+    pages = sorted(m.pages)
+    if jobs == 1 or len(pages) < 64:
+        check_init(m)
+        results = map(check_page, pages)
+    else:
+        pool = multiprocessing.Pool(jobs, check_init, (m,))
+        results = pool.map(check_page, pages, chunksize=max(1, len(pages) // 64))
+        pool.close()
+    findings = [f for result in results for f in result]
+    stats = {'pages': len(pages),
+             'links': sum(len(links) for (links, anchors) in m.pages.values())}
+    return (findings, stats)
@@ -0,0 +1,115 @@
+# mlexer module
+#
+# A MATLAB tokenizer for the code pages, one pass over the text, each line
+# scanned left to right once by a single regular expression.
+#
+# for tokens in lex(text):
+#     for (type, text) in tokens:
+#         ...
+#
+# lex() yields the tokens of each line, the line end is a last 'newline'
+# token if there is one.  The text of the tokens of a line joins to the
+# line.  The types are:
+#
+#   keyword   a reserved word, or one of classdef's block words where it
+#             opens a block directly in the body of a classdef
+#   name      any other identifier
+#   number    123, 1.5e-3, 2i
+#   string    'single quoted' or "double quoted", with doubled quotes
+#             inside, up to the end of the line if not closed
+#   comment   from % to the end of the line, ... and the rest of the line,
+#             and every line of a %{ ... %} block comment, which may nest
+#   space     blanks
+#   text      operators and punctuation, including the transpose '
+#   newline   the end of the line
+#
+# A ' is a transpose when it follows, with no blank between, a name, a
+# number, a closing bracket, a transpose or a ., and otherwise starts a
+# string, as MATLAB reads it.  In a string % is not a comment.
+#
+# properties, methods, events and enumeration are ordinary functions, as in
+# methods(obj), except at the start of a statement directly inside classdef.
+# The blocks of a classdef file are followed from keyword to end, an end
+# inside brackets is an index.
+
+import re
+
+keywords = frozenset([
+    'break', 'case', 'catch', 'classdef', 'continue', 'else', 'elseif', 'end',
+    'for', 'function', 'global', 'if', 'otherwise', 'parfor', 'persistent',
+    'return', 'spmd', 'switch', 'try', 'while',
+    ])
+# keywords only directly inside a classdef block
+class_keywords = frozenset(['properties', 'methods', 'events', 'enumeration'])
+# the keywords that open a block closed by end
+openers = frozenset(['classdef', 'for', 'function', 'if', 'parfor', 'spmd',
+                     'switch', 'try', 'while']) | class_keywords
+
+re_line = re.compile(r'([^\r\n]*)(\r\n|\r|\n)?')
+re_block_start = re.compile(r'[ \t]*%\{[ \t]*$')
+re_block_end = re.compile(r'[ \t]*%\}[ \t]*$')
+# the character before a ' decides if it is a transpose, a string ends
+# with a ' only if it is not doubled so a ' after a ' is a transpose too
+re_token = re.compile(r'''
+      (?P<space>[ \t]+)
+    | (?P<comment>%.*|\.\.\..*)
+    | (?P<name>[A-Za-z]\w*)
+    | (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eEdD][+-]?\d+)?[ij]?)
+    | (?P<string>"(?:[^"]|"")*"?|(?<![\w)\]}.'])'(?:[^']|'')*'?)
+    | (?P<text>'|[)\]}.]|[^ \tA-Za-z0-9%."')\]}]+)
+    ''', re.X)
+
+
+def lex(text):
+    depth = 0
+    blocks = []         # the open blocks, once a classdef is seen
+    pos = 0
+    n = len(text)
+    while pos < n:
+        m = re_line.match(text, pos)
+        pos = m.end()
+        (line, eol) = m.groups()
+
+        if depth or re_block_start.match(line):
+            # a block comment, %{ and %} must be alone on their lines
+            if re_block_start.match(line):
+                depth += 1
+            elif re_block_end.match(line):
+                depth -= 1
+            tokens = [('comment', line)] if line else []
+        else:
+            tokens = scan(line)
+            classdef_blocks(tokens, blocks)
+
+        if eol:
+            tokens.append(('newline', eol))
+        yield tokens
+
+
+def scan(line):
+    tokens = [(m.lastgroup, m.group()) for m in re_token.finditer(line)]
+    return [('keyword', s) if kind == 'name' and s in keywords else (kind, s)
+            for (kind, s) in tokens]
+
+
+def classdef_blocks(tokens, blocks):
+    # follow the blocks of a line of a classdef file, and make the block
+    # words at the start of a statement directly inside classdef keywords
+    nesting = 0         # brackets open on the line
+    start = True        # at the start of a statement
+    for (i, (kind, s)) in enumerate(tokens):
+        if kind in ('space', 'comment'):
+            continue
+        if kind == 'name' and s in class_keywords and start and nesting == 0 \
+                and blocks and blocks[-1] == 'classdef':
+            kind = 'keyword'
+            tokens[i] = (kind, s)
+        if kind == 'keyword' and nesting == 0:
+            if s == 'end':
+                if blocks:
+                    blocks.pop()
+            elif s in openers and (blocks or s == 'classdef'):
+                blocks.append(s)
+        elif kind == 'text':
+            nesting += sum(s.count(c) for c in '([{') - sum(s.count(c) for c in ')]}')
+        start = kind == 'text' and s.rstrip()[-1:] in (',', ';')
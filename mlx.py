@@ -0,0 +1,88 @@
+# mlx module
+#
+# The documentation and code of a MATLAB Live Script or Live Function, an
+# .mlx file, as the text of the equivalent m-file so that it is scanned and
+# rendered like any other.
+#
+# text = mtext(data)
+#   data is the bytes of the .mlx file.  Only the document part of the zip
+#   container is read, and it is parsed as it is inflated, nothing is
+#   written to disk
+#
+# The document is a sequence of paragraphs, each with a style.  Code
+# paragraphs are lines of code.  The text before the first line of code, or
+# directly after the function line of a Live Function, is the help and goes
+# to the top of the file: the first paragraph becomes the H1 line, headings
+# become "Heading::" lines and other paragraphs comment lines.  Any other
+# text becomes comment lines where it is.
+
+import zipfile
+from cStringIO import StringIO
+try:
+    import xml.etree.cElementTree as ElementTree
+except ImportError:
+    import xml.etree.ElementTree as ElementTree
+
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+REL = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+OFFICE_DOCUMENT = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument'
+
+
+def document_part(archive):
+    # the name of the document part, from the package relationships
+    try:
+        rels = ElementTree.fromstring(archive.read('_rels/.rels'))
+    except KeyError:
+        return 'matlab/document.xml'
+    for rel in rels.iter(REL + 'Relationship'):
+        if rel.get('Type') == OFFICE_DOCUMENT:
+            return rel.get('Target').lstrip('/')
+    return 'matlab/document.xml'
+
+
+def paragraphs(stream):
+    # (style, text) of each paragraph of a document, elements are dropped
+    # as soon as they are read
+    for (event, elem) in ElementTree.iterparse(stream):
+        if elem.tag != W + 'p':
+            continue
+        style = elem.find('%spPr/%spStyle' % (W, W))
+        style = style.get(W + 'val') if style is not None else 'text'
+        text = []
+        for node in elem.iter():
+            if node.tag == W + 't' and node.text:
+                text.append(node.text)
+            elif node.tag == W + 'tab':
+                text.append('\t')
+            elif node.tag == W + 'br':
+                text.append('\n')
+        yield (style, ''.join(text))
+        elem.clear()
+
+
+def mtext(data):
+    archive = zipfile.ZipFile(StringIO(data))
+    stream = archive.open(document_part(archive))
+    help = []           # the comment block at the top of the m-file
+    body = []           # the code, and text after the help
+    inhelp = True       # text still adds to the help
+    for (style, text) in paragraphs(stream):
+        text = text.encode('utf-8')
+        if style == 'code':
+            # a Live Function has its help after the function line
+            if inhelp and (help or body or not text.lstrip().startswith('function')):
+                inhelp = False
+            body.extend(text.split('\n'))
+            continue
+        lines = help if inhelp else body
+        for (i, line) in enumerate(text.split('\n')):
+            if not line:
+                lines.append('%')
+            elif lines is help and not help:
+                # the H1 line
+                lines.append('%' + line)
+            elif style == 'heading' and i == 0:
+                lines.append('% ' + line.rstrip(':') + '::')
+            else:
+                lines.append('% ' + line)
+    return '\n'.join(help + body) + '\n'
@@ -0,0 +1,108 @@
+# outputs module
+#
+# The files help2doc owns in an output folder, with a hash of each, kept
+# from run to run so that a run can tell which files it added, modified or
+# removed since the last, and delete those it no longer makes.  A publisher
+# then needs to upload only the delta rather than the whole site.
+#
+# o = Outputs(outdir, filename='.help2doc.files')
+# o.add(path, data, owner=None)
+#   note a file written by the run, path as written, below outdir.  owner
+#   is the name of the module the file documents, None for a file of the
+#   toolbox as a whole, an index or the stylesheet
+# o.add_file(path, owner=None)   ... a file written by other means, read back
+# o.keep(path)                   a file the run did not write but still
+#                                owns, an up to date method page
+# (added, modified, removed) = o.delta(names)
+#   the paths relative to outdir, names are the modules of the toolbox.  A
+#   file of the last run that this run did not write is removed if it is a
+#   file of the toolbox as a whole, if its module is gone, or if its module
+#   was rendered without it, otherwise it is the page of a module that was
+#   not rendered, up to date or not selected, and is still owned
+# o.prune()                      delete the files removed, by this run or
+#                                by an earlier one that did not prune, and
+#                                the folders they leave empty
+# o.save()
+#
+# The file list is kept on disk as JSON, a run that does not keep it leaves
+# it as it was, so the next delta is against the last run that did.
+
+import os
+import json
+import hashlib
+
+
+class Outputs(object):
+
+    def __init__(self, outdir=None, filename='.help2doc.files'):
+        self.outdir = outdir or '.'
+        self.filename = os.path.join(self.outdir, filename)
+        self.old = {}       # key=path, value=[hash, owner], at the last run
+        self.new = {}       # ... written by this run
+        self.kept = set()   # paths owned but not written by this run
+        self.orphans = set()    # paths removed but not yet deleted
+
+        if os.path.exists(self.filename):
+            with open(self.filename, 'r') as f:
+                state = json.load(f)
+            self.old = state['files']
+            self.orphans = set(state.get('orphans', []))
+
+    def save(self):
+        with open(self.filename, 'w') as f:
+            json.dump({'files': self.new, 'orphans': sorted(self.orphans)}, f,
+                      indent=1, sort_keys=True)
+
+    def relpath(self, path):
+        return os.path.relpath(path, self.outdir)
+
+    def add(self, path, data, owner=None):
+        self.new[self.relpath(path)] = [hashlib.sha1(data).hexdigest(), owner]
+
+    def add_file(self, path, owner=None):
+        with open(path, 'rb') as f:
+            self.add(path, f.read(), owner)
+
+    def keep(self, path):
+        self.kept.add(self.relpath(path))
+
+    def delta(self, names):
+        names = set(name.lower() for name in names)
+        rendered = set(owner.lower() for (digest, owner) in self.new.values() if owner)
+        for (path, (digest, owner)) in self.old.items():
+            if path in self.new:
+                continue
+            if path in self.kept or \
+                    owner and owner.lower() in names and owner.lower() not in rendered:
+                self.new[path] = [digest, owner]
+        added = sorted(path for path in self.new if path not in self.old)
+        modified = sorted(path for path in self.new
+                          if path in self.old and self.new[path][0] != self.old[path][0])
+        removed = sorted(path for path in self.old if path not in self.new)
+        self.orphans = set(path for path in self.orphans | set(removed) if path not in self.new)
+        return (added, modified, removed)
+
+    def prune(self):
+        # a folder that holds a file of this run may still be waiting for
+        # it to be written
+        used = set()
+        for path in self.new:
+            folder = os.path.dirname(path)
+            while folder:
+                used.add(folder)
+                folder = os.path.dirname(folder)
+        for path in sorted(self.orphans):
+            try:
+                os.remove(os.path.join(self.outdir, path))
+            except OSError:
+                # already gone
+                pass
+            folder = os.path.dirname(path)
+            while folder and folder not in used:
+                try:
+                    os.rmdir(os.path.join(self.outdir, folder))
+                except OSError:
+                    # not empty
+                    break
+                folder = os.path.dirname(folder)
+        self.orphans = set()
@@ -1,5 +1,7 @@
 import re
+from array import array
 from datetime import date
+from cStringIO import StringIO
 
 # debug options
 debug_chunk = False
@@ -24,19 +26,58 @@ statenames = ['BLANKLINE', 'HEADER', 'TABLE', 'LIST', 'TEXT',
               'SEEALSO', 'SUMMARY', 'TABLESEP', 'END']
 
 
-# regular expressions for code parsing
+# the line types a comment line is classified as, in the order they are
+# tried, a line that matches none of them is TEXT.  The text of a line is
+# the group text, for a TABLE the groups col1 and col2.
 #  \s is whitespace
 #  \S is not whitespace
-re_table = re.compile(r'\s*(?P<col1>\S[\s\S]+?)\s\s\s+(?P<col2>.+)')
-re_tablesep = re.compile(r'-+')
-re_bullet = re.compile(r'\s+-\s*(?P<text>.*)')
-re_text = re.compile(r'\s*(?P<text>.*)')
-re_header = re.compile(r'\s*(?P<text>[A-Z][^:]+)::$')
-re_seealso = re.compile(r'\s*See also\s*(?P<text>.*?)\.$')
-# re_code = re.compile(r' {8}\s*(?P<text>.+)')
+rules = [
+    # TEXT::
+    (HEADER, r'\s*(?P<text>[A-Z][^:]+)::$'),
+    #  OPT   TEXT   at least 3 spaces between.  OPT indented 8 or more is
+    # verbatim code, not a table
+    (TABLE, r'\s{0,7}(?P<col1>\S[\s\S]+?)\s\s\s+(?P<col2>.+)'),
+    # --
+    (TABLESEP, r'-+'),
+    #  - TEXT
+    (LIST, r'\s+-\s*(?P<text>.*)'),
+    # See also TEXT.
+    (SEEALSO, r'\s*See also\s*(?P<text>.*?)\.$'),
+    ]
+
+re_group = re.compile(r'\(\?P([<=])(\w+)')
+classifier = None
+
+
+def add_line(name, pattern, before=TEXT):
+    # a line type of a site's own, tried before the type before, TEXT by
+    # default.  pattern may have a group text, the text of the line, else
+    # the text is the whole line.  Returns the new type
+    global classifier
+    typ = len(statenames) + 1
+    statenames.append(name)
+    types = [rule[0] for rule in rules]
+    rules.insert(types.index(before) if before in types else len(rules), (typ, pattern))
+    classifier = None
+    return typ
+
+
+def compile_rules():
+    # all the rules as one regular expression, a line is matched once.  The
+    # rule that matched is the group Rtype, its groups are renamed Rtype_name
+    global classifier
+    alternatives = []
+    for (typ, pattern) in rules:
+        pattern = re_group.sub(lambda m, typ=typ: '(?P%sR%d_%s' % (m.group(1), typ, m.group(2)), pattern)
+        alternatives.append('(?P<R%d>%s)' % (typ, pattern))
+    classifier = re.compile('|'.join(alternatives))
+    return classifier
 
 
 class MATLABLine(object):
+    # slots, not a __dict__, since there is one of these per comment line
+    __slots__ = ('indent', 'type', 'textdata')
+
     def __init__(self, indent, type, text):
         self.indent = indent   # can be a list in case of table
         self.type = type
@@ -64,37 +105,193 @@ class MATLABLine(object):
         return self.textdata[1].strip()
 
 
+# text of every blank line, shared since it is never modified
+BLANK = ('',)
+
+
 class MATLABLineEnd(Exception):
     pass
 
+
+def classify_spans(line):
+    # classify a comment line with the leading % and trailing space removed
+    #
+    # returns (type, indent, indent2, start, end, start2, end2) where the
+    # text of the line is line[start:end], and for a table the second column
+    # is line[start2:end2] and starts at indent2.  start is -1 if there is no
+    # text.
+
+    if line == '':
+        return (BLANKLINE, 0, 0, 0, 0, 0, 0)
+
+    m = (classifier or compile_rules()).match(line)
+    if m:
+        rule = m.lastgroup
+        typ = int(rule[1:])
+        if typ == TABLE:
+            # the two chunks of text are <opt>, <text>
+            (col1, col2) = (rule + '_col1', rule + '_col2')
+            return (TABLE, m.start(col1), m.start(col2),
+                    m.start(col1), m.end(col1), m.start(col2), m.end(col2))
+        elif typ == TABLESEP:
+            return (TABLESEP, 0, 0, -1, -1, 0, 0)
+        text = rule + '_text'
+        if text in m.re.groupindex and m.start(text) >= 0:
+            return (typ, m.start(text), 0, m.start(text), m.end(text), 0, 0)
+
+    indent = len(line) - len(line.lstrip())
+    if m:
+        return (typ, indent, 0, indent, len(line), 0, 0)
+    return (TEXT, indent, 0, 0, len(line), 0, 0)
+
+
+class TokenBlock(object):
+    # A comment block tokenized into parallel arrays, one element per line:
+    # type, indent, table column 2 indent, and the offsets of the text in the
+    # original string.  The text itself is only sliced out when asked for, so
+    # a parsed block costs the original string plus ~25 bytes per line.
+    #
+    # b = TokenBlock(doc)
+    # len(b)        number of lines
+    # b.type(i)     type of line i, END beyond the last line
+    # b.text(i)     text of line i, None for TABLESEP
+    # b.text2(i)    text of the second column of a TABLE line
+
+    __slots__ = ('doc', 'types', 'indent', 'indent2', 'start', 'end', 'start2', 'end2')
+
+    def __init__(self, doc):
+        self.doc = doc
+        self.types = array('b')
+        self.indent = array('i')
+        self.indent2 = array('i')
+        self.start = array('i')
+        self.end = array('i')
+        self.start2 = array('i')
+        self.end2 = array('i')
+
+        pos = 0
+        n = len(doc)
+        while True:
+            k = doc.find('\n', pos)
+            if k < 0:
+                k = n
+            self.add(doc[pos:k], pos, pos == 0)
+            if k == n:
+                break
+            pos = k + 1
+
+    def add(self, line, pos, first):
+        if line and line[0] != '%':
+            # non-comment line ends the block
+            token = (END, 0, 0, -1, -1, 0, 0)
+        else:
+            text = line.lstrip('%')
+            pos += len(line) - len(text)
+            text = text.rstrip()
+            if first:
+                lead = len(text) - len(text.lstrip())
+                token = (SUMMARY, 0, 0, lead, len(text), 0, 0)
+            else:
+                token = classify_spans(text)
+        (typ, indent, indent2, start, end, start2, end2) = token
+        self.types.append(typ)
+        self.indent.append(indent)
+        self.indent2.append(indent2)
+        if start < 0:
+            self.start.append(-1)
+            self.end.append(-1)
+        else:
+            self.start.append(pos + start)
+            self.end.append(pos + end)
+        self.start2.append(pos + start2)
+        self.end2.append(pos + end2)
+
+    def __len__(self):
+        return len(self.types)
+
+    def type(self, i):
+        if i < len(self.types):
+            return self.types[i]
+        return END
+
+    def text(self, i):
+        if self.start[i] < 0:
+            return None
+        return self.doc[self.start[i]:self.end[i]]
+
+    def text2(self, i):
+        return self.doc[self.start2[i]:self.end2[i]]
+
+    def token(self, i):
+        # the line as a (text, indent, type) tuple, text is a list
+        typ = self.type(i)
+        if typ == END:
+            return ('', 0, END)
+        elif typ == BLANKLINE:
+            return ([''], 0, BLANKLINE)
+        elif typ == TABLESEP:
+            return (None, 0, TABLESEP)
+        elif typ == TABLE:
+            return ([self.text(i), self.text2(i)], [self.indent[i], self.indent2[i]], TABLE)
+        else:
+            return ([self.text(i)], self.indent[i], typ)
+
+
 # p = Parser(mfile)
 # l = p.nextLine()
 # returns an object with properties: type, text, indent
+#
+# the comment can be given as a string or a TokenBlock, which allows a
+# block tokenized once to be formatted many times
 
 
 class Parser(object):
     def __init__(self, doc):
         self.linenum = 0
-        self.lines = doc.split('\n')
+        if isinstance(doc, TokenBlock):
+            self.block = doc
+        else:
+            self.block = TokenBlock(doc)
 
     def nextLine(self):
 
         # get comment line, classify it
-        (text, indent, typ) = self.readline()
+        block = self.block
+        i = self.linenum
+        typ = block.type(i)
+        self.linenum += 1
 
         if typ == TABLE:
-            z = self.peekline()  # peek at next line
-            if z[2] == TEXT and z[1] == indent[1]:
+            indent = [block.indent[i], block.indent2[i]]
+            text = [block.text(i), block.text2(i)]
+            if block.type(i + 1) == TEXT and block.indent[i + 1] == indent[1]:
                 # continuation line
-                text[0] += ' ' + z[0][0]
-                self.readline()  # consume that line
+                text[0] += ' ' + block.text(i + 1)
+                self.linenum += 1  # consume that line
 
         elif typ == LIST:
-            z = self.peekline()  # peek at next line
-            if z[2] == TEXT and z[1] == indent:
+            indent = block.indent[i]
+            text = [block.text(i)]
+            if block.type(i + 1) == TEXT and block.indent[i + 1] == indent:
                 # continuation line
-                text[0] += ' ' + z[0][0]
-                self.readline()  # consume that line
+                text[0] += ' ' + block.text(i + 1)
+                self.linenum += 1  # consume that line
+
+        elif typ == END:
+            indent = 0
+            text = ''
+
+        elif typ == BLANKLINE:
+            indent = 0
+            text = BLANK
+
+        elif typ == TABLESEP:
+            indent = 0
+            text = None
+
+        else:
+            indent = block.indent[i]
+            text = [block.text(i)]
 
         if debug_line:
             self.showline(indent, typ, text)
@@ -106,92 +303,24 @@ class Parser(object):
     def readline(self):
         # return the next MATLAB comment line from the string
         # returns on the first non-comment line found
-        try:
-            line = self.lines.pop(0)
-        except IndexError:
+        if self.linenum >= len(self.block):
             return ('', 0, END)
         self.linenum += 1
-
-        if line and line[0] != '%':
-            return ('', 0, END)
-        line = line.lstrip('%')
-        line = line.rstrip()
-        if debug_line:
-            print '---|%s|' % line
-        if self.linenum == 1:
-            return ([line.strip()], 0, SUMMARY)
-        else:
-            return self.classify(line)
+        return self.block.token(self.linenum - 1)
 
     def peekline(self, i=0):
         # return the next MATLAB comment line from the string
         # returns on the first non-comment line found
-        try:
-            line = self.lines[i]
-        except IndexError:
-            return ('', 0, END)
-
-        if line and line[0] != '%':
-            return ('', 0, END)
-        line = line.lstrip('%')
-        line = line.rstrip()
-        return self.classify(line)
+        return self.block.token(self.linenum + i)
 
     def classify(self, line):
-
-        if line == '':
-            return ([''], 0, BLANKLINE)
-
-        # TEXT::
-        m = re_header.match(line)
-        if m:
-            indent = m.start('text')
-            chunk = [m.group('text')]
-            return (chunk, indent, HEADER)
-
-        #  OPT   TEXT   at least 3 spaces between
-        m = re_table.match(line)
-        if m:
-            # the two chunks of text are <opt>, <text>
-            # if indent >= 8:
-            #     # if opt is indented >= 8 this signals verbatim mode
-            #     # ie. PARA with indent 8
-            #     m2 = re_para.match(line)
-            #     if m2:
-            #         state = PARA
-            #         indent = m2.start('text')
-            #         curIndent = indent
-            #         chunk = [m2.group('text')]
-            #         return (chunk, indent, state)
-            # otherwise a table line
-            chunk = [m.group('col1'), m.group('col2')]
-            if m.start('col1') < 8:
-                return (chunk, [m.start('col1'), m.start('col2')], TABLE)
-
-        # --
-        m = re_tablesep.match(line)
-        if m:
+        (typ, indent, indent2, start, end, start2, end2) = classify_spans(line)
+        if typ == TABLE:
+            return ([line[start:end], line[start2:end2]], [indent, indent2], TABLE)
+        elif typ == TABLESEP:
             return (None, 0, TABLESEP)
-
-        #  - TEXT
-        m = re_bullet.match(line)
-        if m:
-            indent = m.start('text')
-            chunk = [m.group('text')]
-            return (chunk, indent, LIST)
-
-        # See also TEXT.
-        m = re_seealso.match(line)
-        if m:
-            indent = m.start('text')
-            chunk = [m.group('text')]
-            return (chunk, indent, SEEALSO)
-
-        m = re_text.match(line)
-        if m:
-            indent = m.start('text')
-            chunk = [m.group(0)]
-            return (chunk, indent, TEXT)
+        else:
+            return ([line[start:end]], indent, typ)
 
     def showchunk(self, indent, typ, text):
         print '<<< getchunk:%s' % stateName(typ),
@@ -211,6 +340,63 @@ class Parser(object):
         print '} >>'
 
 
+def seealso(line):
+    # return the list of functions on a See also comment line, or None if
+    # the line would not be classified as SEEALSO
+    if 'See also' not in line:
+        return None
+    line = line.strip().lstrip('%').rstrip()
+    (typ, indent, indent2, start, end, start2, end2) = classify_spans(line)
+    if typ != SEEALSO:
+        return None
+    return [func.strip() for func in line[start:end].split(',')]
+
+
+# a function line, the name is the group func
+re_function = re.compile(r'\s*function\s+(?P<lhs>.*=)?\s*(?P<func>[a-zA-Z][\w\.]*)(?P<args>.*)')
+
+
+def comment_block(lines, i):
+    # the comment block starting at line i, its lines left stripped, and the
+    # index of the line that ends it
+    comment = ''
+    while i < len(lines):
+        line = lines[i].strip()
+        if not line or line[0] != '%':
+            break
+        comment += lines[i].lstrip()
+        i += 1
+    return (comment, i)
+
+
+def mfile(text):
+    # the comment blocks of an m-file, as the generator reads them.  Yields
+    # (0, None, comment) for the block at the top of the file, then
+    # (i, line, comment) for each line below it, stripped, with i its index:
+    # comment is the block that follows a function line, None for any other
+    # line.  The line that ends a block goes with it and is not yielded
+    lines = StringIO(text).readlines()
+    (comment, i) = comment_block(lines, 0)
+    yield (0, None, comment)
+    i += 1
+    while i < len(lines):
+        line = lines[i].strip()
+        if line.startswith('function'):
+            (comment, j) = comment_block(lines, i + 1)
+            yield (i, line, comment)
+            i = j + 1
+        else:
+            yield (i, line, None)
+            i += 1
+
+
+def tags(line):
+    # the tags of a %## tag line, None if the line is not one
+    if line.startswith('%## '):
+        return [tag for tag in line[3:].strip().split(' ') if tag]
+    return None
+
+
 def stateName(c):
     if c:
         return statenames[c - 1]
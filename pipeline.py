@@ -0,0 +1,137 @@
+# pipeline module
+#
+# Overlaps the file I/O of a run with parsing and rendering, which stay on
+# the main thread so the order of the run, and its output, is the same as
+# a serial run.
+#
+# for (item, data) in prefetch(items, read, threads=4, depth=16):
+#     ...
+#   calls read(item) on a pool of threads, running up to depth items
+#   ahead of the consumer, and yields the results in the order of items
+#
+# w = Writer(threads=4, depth=16)
+# w.write(filename, data)       queue data to be written to filename
+# w.close()                     wait for all writes to finish
+#   writes to the same filename are made in the order queued, at most
+#   depth pending writes per thread are held in memory
+#
+# With threads=0 both are serial.  An exception raised by read() or by a
+# write is raised again in the main thread.
+
+import sys
+import threading
+import Queue
+
+
+class Slot(object):
+    # the result of one read, filled in by a reader thread
+    def __init__(self, item):
+        self.item = item
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+    def get(self):
+        # no timeout, in Python 2 a timed wait polls with sleeps
+        self.done.wait()
+        if self.error:
+            raise self.error[0], self.error[1], self.error[2]
+        return self.result
+
+
+def prefetch(items, read, threads=4, depth=16):
+    if threads <= 0:
+        for item in items:
+            yield (item, read(item))
+        return
+
+    work = Queue.Queue()
+    ordered = Queue.Queue(maxsize=depth)
+
+    def feeder():
+        # blocks once depth items are waiting for the consumer
+        for item in items:
+            slot = Slot(item)
+            ordered.put(slot)
+            work.put(slot)
+        ordered.put(None)
+        for i in range(threads):
+            work.put(None)
+
+    def reader():
+        while True:
+            slot = work.get()
+            if slot is None:
+                break
+            try:
+                slot.result = read(slot.item)
+            except:
+                slot.error = sys.exc_info()
+            slot.done.set()
+
+    workers = [threading.Thread(target=feeder)]
+    workers += [threading.Thread(target=reader) for i in range(threads)]
+    for worker in workers:
+        worker.daemon = True
+        worker.start()
+
+    while True:
+        slot = ordered.get()
+        if slot is None:
+            break
+        yield (slot.item, slot.get())
+
+
+def writefile(filename, data):
+    with open(filename, 'w') as f:
+        f.write(data)
+
+
+class Writer(object):
+
+    def __init__(self, threads=4, depth=16):
+        self.queues = []
+        self.workers = []
+        self.error = None
+        for i in range(threads):
+            q = Queue.Queue(maxsize=depth)
+            worker = threading.Thread(target=self.run, args=(q,))
+            worker.daemon = True
+            worker.start()
+            self.queues.append(q)
+            self.workers.append(worker)
+
+    def run(self, q):
+        while True:
+            job = q.get()
+            if job is None:
+                break
+            try:
+                writefile(*job)
+            except:
+                if not self.error:
+                    self.error = sys.exc_info()
+
+    def write(self, filename, data):
+        if self.error:
+            self.close()
+        if not self.queues:
+            writefile(filename, data)
+            return
+        # the same file always goes to the same thread, so the last write
+        # wins as it would in a serial run
+        q = self.queues[hash(filename) % len(self.queues)]
+        q.put((filename, data))
+
+    def close(self):
+        for q in self.queues:
+            q.put(None)
+        for worker in self.workers:
+            while worker.is_alive():
+                worker.join(1.0)
+        self.queues = []
+        self.workers = []
+        if self.error:
+            error = self.error
+            self.error = None
+            raise error[0], error[1], error[2]
@@ -0,0 +1,103 @@
+# synth module
+#
+# Synthetic MATLAB documentation, used to benchmark help2doc on toolboxes
+# much larger than any real one.  The output is deterministic for a given
+# seed.
+#
+# comment(name, rng)            a documentation comment block
+# mfile(name, rng, names)       an m-file with a comment block, See also
+#                               lines refer to other names
+# code(name, rng, names, n)     n lines of MATLAB code calling other names
+# toolbox(path, n, seed=0, lines=0)
+#                               write n m-files to the folder path, each
+#                               with lines lines of code
+
+import os
+import random
+
+words = ('the', 'matrix', 'rotation', 'is', 'a', 'of', 'vector', 'returns',
+         'angle', 'pose', 'in', 'radians', 'and', 'for', 'each', 'element',
+         'homogeneous', 'transform', 'robot', 'joint', 'coordinates')
+
+
+def sentence(rng, n):
+    return ' '.join(rng.choice(words) for i in range(n))
+
+
+def comment(name, rng, names=()):
+    # return a comment block using every kind of markup
+    lines = ['%%%s %s' % (name.upper(), sentence(rng, 4)), '%']
+    for i in range(rng.randint(1, 3)):
+        lines.append('%% R = %s(X, Y) %s' % (name.upper(), sentence(rng, 10)))
+        lines.append('%% %s' % sentence(rng, 12))
+        lines.append('%')
+    lines.append('% Options::')
+    for i in range(rng.randint(1, 6)):
+        lines.append("%%  'opt%d',V    %s" % (i, sentence(rng, 6)))
+    lines.append('%')
+    lines.append('% Notes::')
+    for i in range(rng.randint(1, 4)):
+        lines.append('%% - %s' % sentence(rng, 8))
+    lines.append('%')
+    lines.append('% Example::')
+    lines.append('%%         R = %s(1, 2);' % name)
+    lines.append('%')
+    if names:
+        also = [rng.choice(names) for i in range(rng.randint(1, 4))]
+        lines.append('%% See also %s.' % ', '.join(also))
+    return '\n'.join(lines) + '\n'
+
+
+def mfile(name, rng, names=()):
+    return comment(name, rng, names) + '\nfunction R = %s(X, Y)\n    R = X;\n' % name
+
+
+def code(name, rng, names=(), n=20):
+    # return lines of code with every kind of token: keywords, strings with
+    # quotes and %, transposes, numbers, comments and block comments
+    lines = []
+    depth = 0
+    while len(lines) < n:
+        k = rng.randrange(8)
+        call = rng.choice(names) if names else 'disp'
+        if k == 0:
+            lines.append("    R = %s(X', Y.') * %g; %% %s" % (call, rng.random(), sentence(rng, 5)))
+        elif k == 1:
+            lines.append("    if X(end)' > 1e-3 && ~isempty(Y)")
+            lines.append("        s = 'it''s 50% done';")
+            lines.append("    else")
+            lines.append('        s = "a ""quoted"" %s";' % sentence(rng, 2))
+            lines.append("    end")
+        elif k == 2:
+            lines.append("    for i=1:numel(X) ...  continued")
+            lines.append("        R(i,:) = [X(i) Y(i)]' + %d;" % rng.randint(0, 99))
+            lines.append("    end")
+        elif k == 3:
+            lines.append("    %{")
+            lines.append("    %s" % sentence(rng, 8))
+            lines.append("    %}")
+        elif k == 4:
+            lines.append("    %% %s" % sentence(rng, 10))
+        elif k == 5:
+            lines.append("    switch opt.%s" % rng.choice(words))
+            lines.append("        case {'a', 'b'}")
+            lines.append("            R = %s(R, 2i);" % call)
+            lines.append("    end")
+        elif k == 6:
+            lines.append("    disp 'command syntax'")
+        else:
+            lines.append("    R = R .^ 2 - X{1}';")
+    return '\n'.join(lines) + '\n'
+
+
+def toolbox(path, n, seed=0, lines=0):
+    rng = random.Random(seed)
+    names = ['func%05d' % i for i in range(n)]
+    if not os.path.exists(path):
+        os.makedirs(path)
+    for name in names:
+        with open(os.path.join(path, name + '.m'), 'w') as f:
+            f.write(mfile(name, rng, names))
+            if lines:
+                f.write(code(name, rng, names, lines))
+    return [os.path.join(path, name + '.m') for name in names]
@@ -0,0 +1,54 @@
+# xref module
+#
+# Cross reference of the See also lines across a toolbox.  Each Module
+# collects the targets of its See also lines as it is parsed, XRef inverts
+# them so that every page can list the functions that refer to it.
+#
+# x = XRef()
+# x.add(name, targets)      for every module, in a single pass
+# x.referenced_by(name)     list of module names whose See also names it
+# x.export(filename)        write the see-also graph as JSON
+#
+# Targets are matched ignoring case, as GenHelp.findfile() does, and a
+# CLASS.METHOD target refers to the page for CLASS.
+
+import json
+
+
+def target(func):
+    # the page, as a lower case key, that a See also entry links to
+    return func.split('.')[0].lower()
+
+
+class XRef(object):
+
+    def __init__(self):
+        self.names = {}     # key=lower case name, value=module name
+        self.refs = {}      # key=lower case target, value=set of module names
+        self.edges = []     # (module name, target) in order added
+
+    def add(self, name, targets):
+        self.names[name.lower()] = name
+        for func in targets:
+            key = target(func)
+            if not key or key == name.lower():
+                # ignore references to self
+                continue
+            refs = self.refs.setdefault(key, set())
+            if name not in refs:
+                refs.add(name)
+                self.edges.append((name, key))
+
+    def referenced_by(self, name):
+        return sorted(self.refs.get(name.lower(), ()), key=str.lower)
+
+    def export(self, filename):
+        # nodes are the modules, edges go from the referring module to the
+        # module named on its See also line, or the name as written if no
+        # such module was processed
+        graph = {
+            'nodes': sorted(self.names.values(), key=str.lower),
+            'edges': [[src, self.names.get(dst, dst)] for (src, dst) in self.edges]
+            }
+        with open(filename, 'w') as f:
+            json.dump(graph, f, indent=1)